@@ -3,7 +3,7 @@ from tkinter import ttk
 from monthly_purchases import show_monthly_purchases
 from top_customers import show_top_customers_interface
 from ui_config import apply_styles
-from upcoming_birthdays import show_upcoming_birthdays
+from upcoming_birthdays import open_upcoming_birthdays_window
 
 def open_analytics_menu(root):
     window = tk.Toplevel(root)
@@ -22,7 +22,7 @@ def open_analytics_menu(root):
     top_clientes_button.pack(fill=tk.X, pady=5)
 
     aniversarios_button = ttk.Button(main_frame, text="Próximos Aniversários",
-                                     command=show_upcoming_birthdays, style="TButton")
+                                     command=open_upcoming_birthdays_window, style="TButton")
     aniversarios_button.pack(fill=tk.X, pady=5)
 
     exportar_button = ttk.Button(main_frame, text="Exportar Dados para Excel",
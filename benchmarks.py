@@ -0,0 +1,454 @@
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import data_access
+import migrations
+
+SOURCE_DATABASE = 'food_supplier.db'
+
+
+def make_scratch_database():
+    # Benchmarks never touch the real database: they run against a copy.
+    scratch_dir = tempfile.mkdtemp(prefix='allegro_bench_')
+    path = os.path.join(scratch_dir, 'food_supplier.db')
+    shutil.copyfile(SOURCE_DATABASE, path)
+    return path
+
+
+def use_database(path):
+    data_access.close_connection()
+    data_access.DATABASE_PATH = path
+    data_access.reset_stats()
+
+
+def make_migrated_database():
+    path = make_scratch_database()
+    use_database(path)
+    migrations._applied = False
+    migrations.run_migrations()
+    return path
+
+
+class ConnectCounter:
+    """Counts sqlite3.connect calls made while the context is active."""
+
+    def __enter__(self):
+        self.count = 0
+        self._original = sqlite3.connect
+
+        def counting_connect(*args, **kwargs):
+            self.count += 1
+            return self._original(*args, **kwargs)
+
+        sqlite3.connect = counting_connect
+        return self
+
+    def __exit__(self, *exc):
+        sqlite3.connect = self._original
+
+
+def legacy_purchase_entry(path):
+    # Replays the queries the purchase window used to issue, each one on its
+    # own connection, as in the per-module connect_to_db() helpers.
+    def run(sql, params=(), commit=False):
+        conn = sqlite3.connect(path)
+        cursor = conn.execute(sql, params)
+        rows = cursor.fetchall()
+        if commit:
+            conn.commit()
+        conn.close()
+        return rows, cursor.lastrowid
+
+    run('SELECT 1')  # initialize_database()
+    clients, _ = run(data_access.SQL_SELECT_CLIENT_CHOICES)
+    recipes, _ = run(data_access.SQL_SELECT_RECIPE_CHOICES)
+    run(data_access.SQL_SELECT_PURCHASES)
+
+    conn = sqlite3.connect(path)
+    cursor = conn.execute(data_access.SQL_INSERT_PURCHASE, (clients[0][0], '2024-01-01', 10.0))
+    for recipe in recipes[:3]:
+        conn.execute(data_access.SQL_INSERT_PURCHASE_ITEM, (cursor.lastrowid, recipe[0], 1))
+    conn.commit()
+    conn.close()
+
+    run(data_access.SQL_SELECT_PURCHASES)
+
+
+def pooled_purchase_entry():
+    clients = data_access.fetch_client_choices()
+    recipes = data_access.fetch_recipe_choices()
+    data_access.fetch_purchases()
+    data_access.insert_purchase(clients[0][0], '2024-01-01', 10.0, [(recipe[0], 1) for recipe in recipes[:3]])
+    data_access.fetch_purchases()
+
+
+def bench_connections(iterations=200):
+    path = make_scratch_database()
+    use_database(path)
+
+    with ConnectCounter() as counter:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            legacy_purchase_entry(path)
+        legacy_elapsed = time.perf_counter() - start
+    legacy_per_action = counter.count / iterations
+
+    with ConnectCounter() as counter:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            pooled_purchase_entry()
+        pooled_elapsed = time.perf_counter() - start
+    pooled_per_action = counter.count / iterations
+
+    print(f"Purchase entry, {iterations} actions")
+    print(f"  per-call connections: {legacy_per_action:.2f} connections/action, "
+          f"{legacy_elapsed / iterations * 1000:.3f} ms/action")
+    print(f"  shared connection:    {pooled_per_action:.2f} connections/action, "
+          f"{pooled_elapsed / iterations * 1000:.3f} ms/action")
+    data_access.close_connection()
+
+
+def populate_purchases(path, rows):
+    conn = sqlite3.connect(path)
+    client_ids = [row[0] for row in conn.execute('SELECT client_id FROM Clientes')]
+    conn.executemany(data_access.SQL_INSERT_PURCHASE,
+                     ((client_ids[i % len(client_ids)], f"{2015 + i % 10}-{1 + i % 12:02d}-{1 + i % 28:02d}",
+                       float(i % 500)) for i in range(rows)))
+    conn.commit()
+    conn.close()
+
+
+def open_benchmark_connection(path, profile):
+    conn = sqlite3.connect(path)
+    if profile is not None:
+        data_access.apply_profile(conn, profile)
+    return conn
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def measure_commits(conn, commits):
+    latencies = []
+    for i in range(commits):
+        start = time.perf_counter()
+        conn.execute(data_access.SQL_INSERT_PURCHASE, (1, '2024-01-01', float(i)))
+        conn.commit()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+# The reader scans Compras itself: Monthly_Summary would answer from a few
+# rows and never overlap the writer's commits.
+REPORT_QUERY = '''
+SELECT strftime('%Y-%m', purchase_date) AS month, SUM(total_amount)
+FROM Compras
+WHERE purchase_date >= ? AND purchase_date < ?
+GROUP BY month
+'''
+
+
+def bench_pragmas(rows=200000, commits=200):
+    print(f"Commit latency and reader/writer concurrency, {rows} purchases")
+    for label, writer_profile, reader_profile in (('defaults', None, None), ('pos/reporting', 'pos', 'reporting')):
+        path = make_scratch_database()
+        populate_purchases(path, rows)
+
+        writer = open_benchmark_connection(path, writer_profile)
+        idle = measure_commits(writer, commits)
+
+        stop = threading.Event()
+        reports = []
+        failures = []
+
+        def report_loop():
+            reader = open_benchmark_connection(path, reader_profile)
+            try:
+                while not stop.is_set():
+                    reader.execute(REPORT_QUERY, ('2015-01-01', '2025-01-01')).fetchall()
+                    reports.append(1)
+            except sqlite3.Error as e:
+                failures.append(e)
+            finally:
+                reader.close()
+
+        reader_thread = threading.Thread(target=report_loop)
+        reader_thread.start()
+        time.sleep(0.05)
+        contended = measure_commits(writer, commits // 4)
+        stop.set()
+        reader_thread.join()
+        writer.close()
+        if failures:
+            raise failures[0]
+
+        print(f"  {label}:")
+        print(f"    idle commits:     mean {sum(idle) / len(idle):.3f} ms, p95 {percentile(idle, 0.95):.3f} ms")
+        print(f"    during reports:   mean {sum(contended) / len(contended):.3f} ms, "
+              f"max {max(contended):.3f} ms ({len(reports)} reports completed)")
+
+
+def legacy_upcoming_birthdays(num_items):
+    # The previous implementation: load every client, parse each birthday in
+    # Python and sort the whole list.
+    rows = data_access.get_connection().execute('SELECT client_name, birthday FROM Clientes').fetchall()
+
+    def convert(date_str):
+        try:
+            return datetime.strptime(date_str, '%d/%m/%Y').strftime('%Y-%m-%d')
+        except ValueError:
+            return date_str
+
+    def next_birthday(birthday):
+        current_year = datetime.now().year
+        birthday_this_year = datetime.strptime(birthday, "%Y-%m-%d").replace(year=current_year)
+        if birthday_this_year < datetime.now():
+            return birthday_this_year.replace(year=current_year + 1)
+        return birthday_this_year
+
+    converted = [(name, convert(bday)) for name, bday in rows]
+    today = datetime.now()
+    return sorted(converted, key=lambda x: (next_birthday(x[1]) - today).days)[:num_items]
+
+
+def bench_birthdays(clients=100000, num_items=10, repeats=5):
+    make_migrated_database()
+    conn = data_access.get_connection()
+    with conn:
+        # Day 1-28 keeps every generated date valid in any year.
+        conn.executemany(data_access.SQL_INSERT_CLIENT,
+                         ((f"Cliente {i}", f"{1 + i % 28:02d}/{1 + (i // 28) % 12:02d}/{1950 + i % 50}", "Rua")
+                          for i in range(clients)))
+        conn.execute('ANALYZE')
+    month_day = datetime.now().strftime('%m-%d')
+
+    def timed(fn):
+        start = time.perf_counter()
+        for _ in range(repeats):
+            fn()
+        return (time.perf_counter() - start) / repeats * 1000
+
+    legacy_ms = timed(lambda: legacy_upcoming_birthdays(num_items))
+    indexed_ms = timed(lambda: data_access.fetch_upcoming_birthdays(month_day, num_items))
+    print(f"Next {num_items} birthdays, {clients} clients")
+    print(f"  load + sort in Python: {legacy_ms:.3f} ms")
+    print(f"  month-day index:       {indexed_ms:.3f} ms")
+    data_access.close_connection()
+
+
+def bench_lists(sizes=(10000, 100000, 400000), repeats=5):
+    print("Opening the purchase list")
+    for rows in sizes:
+        path = make_migrated_database()
+        populate_purchases(path, rows)
+
+        def timed(fn):
+            start = time.perf_counter()
+            for _ in range(repeats):
+                loaded = fn()
+            return (time.perf_counter() - start) / repeats * 1000, len(loaded)
+
+        full_ms, full_rows = timed(data_access.fetch_purchases)
+        page_ms, page_rows = timed(data_access.fetch_purchases_page)
+        print(f"  {rows} purchases: fetchall {full_ms:.3f} ms ({full_rows} rows), "
+              f"first page {page_ms:.3f} ms ({page_rows} rows)")
+        data_access.close_connection()
+
+
+def bench_exports(rows=200000):
+    import export_data  # needs the GUI dependencies, so only imported here
+
+    path = make_migrated_database()
+    populate_purchases(path, rows)
+    out_dir = os.path.dirname(path)
+    print(f"Export of Compras, {rows} rows")
+    for label, (extension, _, export) in export_data.EXPORT_FORMATS.items():
+        start = time.perf_counter()
+        files = export(['Compras'], '2000-01-01', '2100-12-31', os.path.join(out_dir, 'export' + extension))
+        elapsed = time.perf_counter() - start
+        size = sum(os.path.getsize(file) for file in files)
+        print(f"  {label:20} {rows / elapsed:12,.0f} rows/s  {size / 1024:10,.1f} KiB")
+    data_access.close_connection()
+
+
+def populate_export_tables(path, rows):
+    populate_purchases(path, rows)
+    conn = sqlite3.connect(path)
+    conn.executemany(data_access.SQL_INSERT_PURCHASE_ITEM, ((1 + i % rows, 1 + i % 5, 1 + i % 3) for i in range(rows)))
+    conn.executemany(data_access.SQL_INSERT_EXPENSE,
+                     ((f"Despesa {i}", f"{2015 + i % 10}-{1 + i % 12:02d}-{1 + i % 28:02d}", float(i % 300),
+                       'Materiais' if i % 2 else 'Investimentos') for i in range(rows)))
+    conn.executemany(data_access.SQL_INSERT_CLIENT,
+                     ((f"Cliente {i}", f"{1 + i % 28:02d}/{1 + i % 12:02d}/1980", "Rua") for i in range(rows)))
+    conn.commit()
+    conn.close()
+
+
+def bench_parallel_export(rows=200000):
+    import export_data  # needs the GUI dependencies, so only imported here
+
+    path = make_migrated_database()
+    populate_export_tables(path, rows)
+    tables = ['Compras', 'Purchase_Items', 'Despesas', 'Clientes']
+    out_dir = os.path.dirname(path)
+    print(f"Export of {len(tables)} tables, about {rows} rows each")
+    for label, (extension, _, export) in export_data.EXPORT_FORMATS.items():
+        start = time.perf_counter()
+        export(tables, '2000-01-01', '2100-12-31', os.path.join(out_dir, 'serial' + extension))
+        serial = time.perf_counter() - start
+        start = time.perf_counter()
+        export_data.export_in_parallel(export, tables, '2000-01-01', '2100-12-31',
+                                       os.path.join(out_dir, 'parallel' + extension))
+        parallel = time.perf_counter() - start
+        print(f"  {label:20} one table at a time {serial:7.2f} s, "
+              f"one process per table {parallel:7.2f} s ({serial / parallel:.1f}x)")
+    data_access.close_connection()
+
+
+def legacy_insert_purchase(conn, client_id, purchase_date, total_amount, items):
+    # The purchase window before insert_with_lines: one execute() per item.
+    with conn:
+        cursor = conn.execute(data_access.SQL_INSERT_PURCHASE, (client_id, purchase_date, total_amount))
+        purchase_id = cursor.lastrowid
+        for recipe_id, quantity in items:
+            conn.execute(data_access.SQL_INSERT_PURCHASE_ITEM, (purchase_id, recipe_id, quantity))
+    return purchase_id
+
+
+def bench_line_items(orders=2000, lines=50, repeats=3):
+    make_migrated_database()
+    conn = data_access.get_connection()
+    client_id = data_access.fetch_client_choices()[0][0]
+    items = [(recipe_id, 1 + i % 3) for i, recipe_id in enumerate(range(1, lines + 1))]
+    print(f"{orders} purchases of {lines} items each")
+    inserts = {
+        'one execute per item': lambda: legacy_insert_purchase(conn, client_id, '2024-01-01', 10.0, items),
+        'executemany': lambda: data_access.insert_purchase(client_id, '2024-01-01', 10.0, items),
+    }
+    best = dict.fromkeys(inserts, float('inf'))
+    # Alternate the two so both see the tables grow at the same pace.
+    for _ in range(repeats):
+        for label, insert in inserts.items():
+            start = time.perf_counter()
+            for _ in range(orders):
+                insert()
+            best[label] = min(best[label], time.perf_counter() - start)
+    for label, seconds in best.items():
+        print(f"  {label:22} {seconds * 1000000 / orders:8.1f} us per purchase")
+    data_access.close_connection()
+
+
+def python_costs(recipes, lines, prices):
+    # Row-by-row pricing, as the recipe list did it before costing.CostModel.
+    price_of = dict(prices)
+    costs = dict.fromkeys((recipe[0] for recipe in recipes), 0.0)
+    for recipe_id, ingredient_id, quantity in lines:
+        costs[recipe_id] += price_of[ingredient_id] * quantity
+    return [(recipe[0], costs[recipe[0]] * (1 + (recipe[4] + recipe[5]) / 100), recipe[3] * recipe[6])
+            for recipe in recipes]
+
+
+def bench_costing(recipes=5000, lines=12, ingredients=500, repeats=20):
+    import costing  # needs numpy
+
+    recipe_rows = [(i, f'Receita {i}', 0.0, 10.0 + i % 7, 10.0, 5.0, 1 + i % 8) for i in range(1, recipes + 1)]
+    line_rows = [(i, 1 + (i * 7 + j * 13) % ingredients, 0.5 + j % 4) for i in range(1, recipes + 1) for j in range(lines)]
+    price_rows = [(i, 1.0 + i % 30) for i in range(1, ingredients + 1)]
+    model = costing.CostModel(recipe_rows, line_rows, price_rows)
+    supplier = {ingredient_id: price * 1.08 for ingredient_id, price in price_rows[:ingredients // 5]}
+    print(f"{recipes} recipes, {recipes * lines} ingredient lines")
+    for label, reprice in (
+            ('python loop', lambda: python_costs(recipe_rows, line_rows,
+                                                 [(i, supplier.get(i, price)) for i, price in price_rows])),
+            ('numpy', lambda: model.breakdown(model.price_vector(supplier)))):
+        best = float('inf')
+        for _ in range(repeats):
+            start = time.perf_counter()
+            reprice()
+            best = min(best, time.perf_counter() - start)
+        print(f"  what-if reprice, {label:12} {best * 1000:8.2f} ms")
+
+
+def write_purchase_csv(path, client_ids, rows):
+    with open(path, 'w', newline='') as target:
+        target.write('client_id;data;valor\n')
+        for i in range(rows):
+            day, month, year = i % 28 + 1, i % 12 + 1, 2015 + i % 10
+            target.write(f"{client_ids[i % len(client_ids)]};{day:02d}/{month:02d}/{year};{i % 500},{i % 100:02d}\n")
+
+
+def bench_bulk_import(rows=1000000, legacy_rows=20000):
+    import bulk_import
+
+    path = make_migrated_database()
+    conn = data_access.get_connection()
+    client_ids = [client_id for client_id, _ in conn.execute(data_access.SQL_SELECT_CLIENT_IDS)]
+    # The old way in: one INSERT and one commit per purchase, as the purchase window does.
+    start = time.perf_counter()
+    for i in range(legacy_rows):
+        with conn:
+            conn.execute(data_access.SQL_INSERT_PURCHASE, (client_ids[i % len(client_ids)], '2020-01-01', 10.0))
+    legacy = legacy_rows / (time.perf_counter() - start)
+    csv_path = os.path.join(os.path.dirname(path), 'compras.csv')
+    write_purchase_csv(csv_path, client_ids, rows)
+    report = bulk_import.import_file('compras', csv_path)
+    print(f"Purchase import: {legacy:,.0f} rows/s one commit per row, "
+          f"{report.rows_per_second:,.0f} rows/s bulk ({report.read} rows in {report.elapsed:.2f} s)")
+    data_access.close_connection()
+
+
+def dashboard_refresh():
+    # What the monthly chart and the top-customer reports ask for on each refresh.
+    data_access.fetch_monthly_purchases('2015-01', '2024-12')
+    data_access.fetch_monthly_expenses('2015-01', '2024-12')
+    data_access.fetch_top_customers(10)
+    data_access.fetch_top_customers_for_month('2024-12', 10)
+
+
+def bench_analytics_cache(rows=200000, refreshes=200, write_every=20):
+    path = make_migrated_database()
+    populate_purchases(path, rows)
+    print(f"{refreshes} report refreshes over {rows} purchases, one expense written every {write_every}")
+    for label, cached in (('uncached', False), ('cached', True)):
+        data_access.clear_analytics_cache()
+        data_access.reset_stats()
+        start = time.perf_counter()
+        for i in range(refreshes):
+            if not cached:
+                data_access.clear_analytics_cache()
+            if i and i % write_every == 0:
+                data_access.insert_expense('Benchmark', '2024-12-01', 1.0, 'Outros')
+            dashboard_refresh()
+        elapsed = time.perf_counter() - start
+        stats = data_access.analytics_cache_stats()
+        print(f"  {label:9} {elapsed / refreshes * 1000:8.3f} ms/refresh, "
+              f"{stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.0%})")
+    data_access.close_connection()
+
+
+BENCHMARKS = {
+    'connections': bench_connections,
+    'pragmas': bench_pragmas,
+    'birthdays': bench_birthdays,
+    'lists': bench_lists,
+    'exports': bench_exports,
+    'parallel_export': bench_parallel_export,
+    'bulk_import': bench_bulk_import,
+    'line_items': bench_line_items,
+    'costing': bench_costing,
+    'analytics_cache': bench_analytics_cache,
+}
+
+
+if __name__ == "__main__":
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        BENCHMARKS[name]()
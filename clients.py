@@ -1,49 +1,15 @@
-import sqlite3
 import tkinter as tk
 from tkinter import messagebox, ttk
 from PIL import Image, ImageTk
 import os
-import re
 
+import data_access
+import db_worker
+from search_controller import SearchController
+from virtual_list import VirtualListbox
 import ui_config
 from ui_config import apply_styles, load_icon
-
-DATABASE_PATH = 'food_supplier.db'
-
-def connect_to_db():
-    try:
-        conn = sqlite3.connect(DATABASE_PATH)
-        return conn
-    except sqlite3.Error as e:
-        messagebox.showerror("Erro de Conexão", f"Erro ao conectar-se ao banco de dados: {e}")
-        return None
-
-def initialize_database():
-    conn = connect_to_db()
-    if conn is not None:
-        cursor = conn.cursor()
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS Clientes (
-            client_id INTEGER PRIMARY KEY,
-            client_name TEXT NOT NULL,
-            birthday TEXT NOT NULL,
-            address TEXT NOT NULL
-        )
-        ''')
-        conn.commit()
-        conn.close()
-
-def validate_inputs(client_name, birthday, address):
-    errors = []
-    if not client_name:
-        errors.append("Nome do Cliente é obrigatório")
-    if not birthday:
-        errors.append("Data de Aniversário é obrigatória")
-    elif not re.match(r'\d{2}/\d{2}/\d{4}', birthday):
-        errors.append("Data de Aniversário deve estar no formato DD/MM/YYYY")
-    if not address:
-        errors.append("Endereço é obrigatório")
-    return errors
+from validation import validate_inputs
 
 def add_or_update_client(client_name, birthday, address, status_label, client_listbox, client_name_entry,
                          birthday_entry, address_entry):
@@ -53,32 +19,17 @@ def add_or_update_client(client_name, birthday, address, status_label, client_li
         highlight_fields(client_name_entry, birthday_entry, address_entry)
         return
 
-    conn = connect_to_db()
-    if conn is not None:
-        cursor = conn.cursor()
-        cursor.execute('''
-        SELECT client_id FROM Clientes WHERE client_name = ?
-        ''', (client_name,))
-        client = cursor.fetchone()
-
-        if client:
-            if tk.messagebox.askyesno("Confirmar Atualização",
-                                      f"Você tem certeza que deseja atualizar o cliente '{client_name}'?"):
-                cursor.execute('''
-                UPDATE Clientes
-                SET birthday = ?, address = ?
-                WHERE client_id = ?
-                ''', (birthday, address, client[0]))
-                status_label.config(text=f"Cliente '{client_name}' atualizado com sucesso.", foreground="green")
-        else:
-            cursor.execute('''
-            INSERT INTO Clientes (client_name, birthday, address) VALUES (?, ?, ?)
-            ''', (client_name, birthday, address))
-            status_label.config(text=f"Cliente '{client_name}' adicionado com sucesso.", foreground="green")
-        conn.commit()
-        conn.close()
-        update_client_list(client_listbox)
-        clear_form(client_name_entry, birthday_entry, address_entry)
+    client_id = data_access.find_client_id(client_name)
+    if client_id is not None:
+        if tk.messagebox.askyesno("Confirmar Atualização",
+                                  f"Você tem certeza que deseja atualizar o cliente '{client_name}'?"):
+            data_access.update_client(client_id, birthday, address)
+            status_label.config(text=f"Cliente '{client_name}' atualizado com sucesso.", foreground="green")
+    else:
+        data_access.insert_client(client_name, birthday, address)
+        status_label.config(text=f"Cliente '{client_name}' adicionado com sucesso.", foreground="green")
+    update_client_list(client_listbox)
+    clear_form(client_name_entry, birthday_entry, address_entry)
 
 def highlight_fields(*fields):
     for field in fields:
@@ -93,16 +44,11 @@ def clear_form(*fields):
         field.delete(0, tk.END)
         clear_highlight(field)
 
+def format_client(client):
+    return f"{client[0]} - {client[1]} - {client[2]} - {client[3]}"
+
 def update_client_list(listbox):
-    conn = connect_to_db()
-    if conn is not None:
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM Clientes ORDER BY client_name')
-        clients = cursor.fetchall()
-        listbox.delete(0, tk.END)
-        for client in clients:
-            listbox.insert(tk.END, f"{client[0]} - {client[1]} - {client[2]} - {client[3]}")
-        conn.close()
+    listbox.refresh()
 
 def delete_client(client_listbox, status_label):
     selected_item = client_listbox.curselection()
@@ -111,26 +57,18 @@ def delete_client(client_listbox, status_label):
         return
     client_id = int(client_listbox.get(selected_item[0]).split(' ')[0])
     if tk.messagebox.askyesno("Confirmar Exclusão", "Você tem certeza que deseja desativar este cliente?"):
-        conn = connect_to_db()
-        if conn is not None:
-            cursor = conn.cursor()
-            cursor.execute('DELETE FROM Clientes WHERE client_id = ?', (client_id,))
-            conn.commit()
-            conn.close()
-            status_label.config(text=f"Cliente ID '{client_id}' desativado com sucesso.", foreground="green")
-            update_client_list(client_listbox)
+        data_access.delete_client(client_id)
+        status_label.config(text=f"Cliente ID '{client_id}' desativado com sucesso.", foreground="green")
+        update_client_list(client_listbox)
+
+def find_clients(search_term):
+    # No words to search for: page through the whole table instead.
+    if data_access.full_text_query(search_term) is None:
+        return None
+    return data_access.search_clients(search_term)
 
 def search_clients(search_term, listbox):
-    conn = connect_to_db()
-    if conn is not None:
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM Clientes WHERE client_name LIKE ? ORDER BY client_name',
-                       ('%' + search_term + '%',))
-        clients = cursor.fetchall()
-        listbox.delete(0, tk.END)
-        for client in clients:
-            listbox.insert(tk.END, f"{client[0]} - {client[1]} - {client[2]} - {client[3]}")
-        conn.close()
+    listbox.show_rows(find_clients(search_term))
 
 def format_date(event):
     content = event.widget.get()
@@ -140,13 +78,13 @@ def format_date(event):
         event.widget.delete(10, tk.END)
 
 def open_add_client_window(root):
-    initialize_database()
     apply_styles(root)
 
     add_client_window = tk.Toplevel(root)
     add_client_window.title("Adicionar Cliente")
     add_client_window.geometry("750x500")
     add_client_window.minsize(750, 500)
+    db_worker.watch_busy(add_client_window)
     add_client_window.configure(bg=ui_config.bg_color)  # Set background color
 
     # Create the main frame
@@ -212,21 +150,27 @@ def open_add_client_window(root):
     search_entry = ttk.Entry(button_frame, style="Main.TEntry")
     search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(0, 10))
 
+    search = SearchController(search_entry, find_clients, lambda clients: client_listbox.show_rows(clients),
+                              lambda client: f"{client[1]} {client[3]}", runner=db_worker.runner(search_entry))
+    search_entry.bind('<KeyRelease>', lambda event: search.schedule(search_entry.get()))
+    search_entry.bind('<Return>', lambda event: search.run_now(search_entry.get()))
+
     search_button = ttk.Button(button_frame, text="Buscar", image=search_icon, compound=tk.LEFT,
-                               command=lambda: search_clients(search_entry.get(), client_listbox), style="Main.TButton")
+                               command=lambda: search.run_now(search_entry.get()), style="Main.TButton")
     search_button.pack(side=tk.LEFT, padx=(0, 10))
 
     # Client list
     list_frame = ttk.Frame(main_frame, style="Main.TFrame")
     list_frame.grid(row=3, column=0, columnspan=4, pady=20, sticky="nsew")
 
-    client_listbox = tk.Listbox(list_frame, width=50, height=10)
+    client_listbox = VirtualListbox(list_frame, data_access.fetch_clients_page, data_access.client_page_key,
+                                    format_client, width=50, height=10)
     client_listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
 
     scrollbar = ttk.Scrollbar(list_frame, orient="vertical", command=client_listbox.yview)
     scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
 
-    client_listbox.config(yscrollcommand=scrollbar.set)
+    client_listbox.attach_scrollbar(scrollbar)
 
     main_frame.grid_rowconfigure(3, weight=1)
     main_frame.grid_columnconfigure(0, weight=1)
@@ -0,0 +1,58 @@
+import heapq
+import tkinter.font as tkFont
+from functools import lru_cache
+from tkinter import ttk
+
+PADDING = 20
+# Above this many rows only the longest texts of each column are measured:
+# in a proportional font the widest cell is almost always among them.
+SAMPLE_SIZE = 200
+
+_fonts = {}
+
+
+def style_font(tree):
+    """Return the tree's style name, loading the Font it uses once per style."""
+    style = tree.cget('style') or tree.winfo_class()
+    if style not in _fonts:
+        font = ttk.Style(tree).lookup(style, 'font') or 'TkDefaultFont'
+        if font in tkFont.names(root=tree):
+            _fonts[style] = tkFont.nametofont(font, root=tree)
+        else:
+            _fonts[style] = tkFont.Font(root=tree, font=font)
+    return style
+
+
+@lru_cache(maxsize=16384)
+def text_width(style, text):
+    return _fonts[style].measure(text)
+
+
+def column_texts(rows, index):
+    texts = [str(values[index]) for values in rows]
+    if len(texts) > SAMPLE_SIZE:
+        texts = heapq.nlargest(SAMPLE_SIZE, set(texts), key=len)
+    return texts
+
+
+def autosize_columns(tree, rows=None, anchor=None, padding=PADDING):
+    """Fit each column of a Treeview to its widest cell (and heading).
+
+    rows are the value tuples shown; by default the ones tree_sync.reconcile
+    put on the tree, read back from Tk otherwise.
+    """
+    if rows is None:
+        shown = getattr(tree, 'shown_rows', None)
+        if shown is not None:
+            rows = list(shown.values())
+        else:
+            rows = [tree.item(item, 'values') for item in tree.get_children()]
+    style = style_font(tree)
+    for index, column in enumerate(tree['columns']):
+        texts = column_texts(rows, index)
+        texts.append(tree.heading(column, 'text'))
+        width = max(text_width(style, text) for text in texts) + padding
+        if anchor is None:
+            tree.column(column, width=width)
+        else:
+            tree.column(column, width=width, anchor=anchor)
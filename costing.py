@@ -0,0 +1,94 @@
+import numpy as np
+
+import data_access
+
+
+class CostModel:
+    """Every recipe's ingredient quantities, priced for all recipes at once.
+
+    Recipe_Ingredients is held as a sparse recipe x ingredient matrix in
+    coordinate form (one entry per line), so pricing is a product with the
+    price vector followed by a bincount per recipe, with no Python loop.
+    """
+
+    def __init__(self, recipes, lines, prices):
+        # recipes: (recipe_id, recipe_name, total_price, selling_price, mao_de_obra, gas_agua_luz, porcoes)
+        # lines: (recipe_id, ingredient_id, quantity); prices: (ingredient_id, price_per_unit)
+        recipes = sorted(recipes)
+        prices = sorted(prices)
+        self.recipe_ids = np.array([recipe[0] for recipe in recipes], dtype=np.int64)
+        self.names = [recipe[1] for recipe in recipes]
+        self.stored_cost = np.array([recipe[2] for recipe in recipes], dtype=float)
+        self.selling_price = np.array([recipe[3] for recipe in recipes], dtype=float)
+        self.mao_de_obra = np.array([recipe[4] for recipe in recipes], dtype=float)
+        self.gas_agua_luz = np.array([recipe[5] for recipe in recipes], dtype=float)
+        self.porcoes = np.array([recipe[6] for recipe in recipes], dtype=float)
+        self.ingredient_ids = np.array([price[0] for price in prices], dtype=np.int64)
+        self.prices = np.array([price[1] for price in prices], dtype=float)
+
+        line_recipes = np.array([line[0] for line in lines], dtype=np.int64)
+        line_ingredients = np.array([line[1] for line in lines], dtype=np.int64)
+        quantities = np.array([line[2] for line in lines], dtype=float)
+        rows = position(self.recipe_ids, line_recipes)
+        columns = position(self.ingredient_ids, line_ingredients)
+        # Lines left behind by deleted recipes or ingredients are dropped.
+        known = (rows >= 0) & (columns >= 0)
+        self.rows, self.columns, self.quantities = rows[known], columns[known], quantities[known]
+        self.has_lines = np.bincount(self.rows, minlength=len(self.recipe_ids)) > 0
+
+    def price_vector(self, changes=None, factor=1.0):
+        """Current prices, optionally with {ingredient_id: price} overrides and/or scaled by factor."""
+        prices = self.prices * factor
+        if changes:
+            columns = position(self.ingredient_ids, np.array(list(changes), dtype=np.int64))
+            values = np.array(list(changes.values()), dtype=float)
+            prices[columns[columns >= 0]] = values[columns >= 0]
+        return prices
+
+    def costs(self, prices=None):
+        prices = self.prices if prices is None else prices
+        costs = np.bincount(self.rows, weights=self.quantities * prices[self.columns],
+                            minlength=len(self.recipe_ids))
+        # Same rule as the cost triggers: no ingredient rows, keep the entered cost.
+        return np.where(self.has_lines, costs, self.stored_cost)
+
+    def breakdown(self, prices=None):
+        """Cost, overhead, expenses (gastos), per-portion cost, revenue, profit and margin per recipe."""
+        cost = self.costs(prices)
+        overhead = cost * (self.mao_de_obra + self.gas_agua_luz) / 100
+        gastos = cost + overhead
+        revenue = self.selling_price * self.porcoes
+        profit = revenue - gastos
+        with np.errstate(divide='ignore', invalid='ignore'):
+            per_portion = np.where(self.porcoes > 0, gastos / self.porcoes, 0.0)
+            margin = np.where(revenue != 0, profit / revenue, 0.0)
+        return {
+            'cost': cost,
+            'overhead': overhead,
+            'gastos': gastos,
+            'per_portion': per_portion,
+            'revenue': revenue,
+            'profit': profit,
+            'margin': margin,
+        }
+
+
+def position(sorted_ids, ids):
+    """Index of each id in sorted_ids, or -1 where it is missing."""
+    if not len(sorted_ids):
+        return np.full(len(ids), -1, dtype=np.int64)
+    found = np.searchsorted(sorted_ids, ids)
+    found[found >= len(sorted_ids)] = 0
+    return np.where(sorted_ids[found] == ids, found, -1)
+
+
+def load_cost_model():
+    return CostModel(*data_access.fetch_cost_inputs())
+
+
+def recipe_rows(prices=None, model=None):
+    """Rows for the recipe list: (id, name, gastos, total price, labour %, utilities %, profit)."""
+    model = model or load_cost_model()
+    figures = model.breakdown(prices)
+    return list(zip(model.recipe_ids.tolist(), model.names, figures['gastos'].tolist(), figures['revenue'].tolist(),
+                    model.mao_de_obra.tolist(), model.gas_agua_luz.tolist(), figures['profit'].tolist()))
@@ -0,0 +1,709 @@
+import itertools
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+from urllib.request import pathname2url
+
+DATABASE_PATH = 'food_supplier.db'
+
+# sqlite3 keeps an LRU of prepared statements per connection, keyed by the SQL
+# text. Every query below is a module-level constant, so a long-lived
+# connection re-uses the compiled statement instead of re-parsing it.
+STATEMENT_CACHE_SIZE = 256
+
+# PRAGMA settings applied to every connection when it is opened. WAL lets the
+# report queries read while the purchase window writes, and synchronous=NORMAL
+# only fsyncs at checkpoints instead of on every commit (still safe in WAL).
+# Negative cache_size values are in KiB.
+PRAGMA_PROFILES = {
+    'pos': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -8000,
+        'mmap_size': 64 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+        'busy_timeout': 5000,
+    },
+    'reporting': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -64000,
+        'mmap_size': 256 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+        'busy_timeout': 15000,
+    },
+}
+DEFAULT_PROFILE = 'pos'
+
+_local = threading.local()
+_stats_lock = threading.Lock()
+_stats = {'connections_opened': 0}
+_connection_serials = itertools.count(1)
+
+
+# Set in processes that only read (e.g. parallel export workers): connections
+# are opened with mode=ro and never try to change the journal mode.
+READ_ONLY = False
+
+
+def apply_profile(conn, profile):
+    for pragma, value in PRAGMA_PROFILES[profile].items():
+        if READ_ONLY and pragma == 'journal_mode':
+            continue
+        conn.execute(f'PRAGMA {pragma} = {value}').fetchall()
+
+
+def use_profile(profile):
+    """Select the PRAGMA profile for the calling thread's connection."""
+    if profile not in PRAGMA_PROFILES:
+        raise ValueError(f"Perfil desconhecido: {profile}")
+    _local.profile = profile
+    conn = getattr(_local, 'conn', None)
+    if conn is not None:
+        apply_profile(conn, profile)
+
+
+def get_connection():
+    """Return the long-lived connection owned by the calling thread."""
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        if READ_ONLY:
+            conn = sqlite3.connect(f'file:{pathname2url(DATABASE_PATH)}?mode=ro', uri=True, cached_statements=STATEMENT_CACHE_SIZE)
+        else:
+            conn = sqlite3.connect(DATABASE_PATH, cached_statements=STATEMENT_CACHE_SIZE)
+        apply_profile(conn, getattr(_local, 'profile', DEFAULT_PROFILE))
+        _local.conn = conn
+        _local.serial = next(_connection_serials)
+        with _stats_lock:
+            _stats['connections_opened'] += 1
+    return conn
+
+
+def close_connection():
+    conn = getattr(_local, 'conn', None)
+    if conn is not None:
+        conn.close()
+        _local.conn = None
+
+
+def connections_opened():
+    with _stats_lock:
+        return _stats['connections_opened']
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats['connections_opened'] = 0
+    with _cache_lock:
+        _cache_stats['hits'] = _cache_stats['misses'] = 0
+
+
+SQL_DATA_VERSION = 'PRAGMA data_version'
+
+
+def change_token():
+    """Value that changes whenever the database is written, by us or by another connection."""
+    conn = get_connection()
+    return conn.total_changes, conn.execute(SQL_DATA_VERSION).fetchone()[0]
+
+
+# Cache de relatórios
+
+# Results of the report queries, keyed by database, query and parameters.
+# An entry is valid while the version counters of the tables it reads are
+# unchanged (the write functions below bump them after committing) and
+# PRAGMA data_version says no other connection or process has committed.
+ANALYTICS_CACHE_SIZE = 128
+
+_cache_lock = threading.Lock()
+_analytics_cache = OrderedDict()
+_table_versions = {}
+_cache_stats = {'hits': 0, 'misses': 0}
+
+
+def bump_table_versions(*tables):
+    """Mark tables as written, so cached reports that read them are recomputed."""
+    with _cache_lock:
+        for table in tables:
+            _table_versions[table] = _table_versions.get(table, 0) + 1
+
+
+def cached_query(sql, params, tables):
+    """fetchall() of a read-only report query, reused while the tables it reads are unchanged."""
+    conn = get_connection()
+    data_version = conn.execute(SQL_DATA_VERSION).fetchone()[0]
+    key = (DATABASE_PATH, sql, params)
+    with _cache_lock:
+        # data_version is only comparable on the connection that read it.
+        versions = (_local.serial, data_version, tuple(_table_versions.get(table, 0) for table in tables))
+        entry = _analytics_cache.get(key)
+        if entry is not None and entry[0] == versions:
+            _analytics_cache.move_to_end(key)
+            _cache_stats['hits'] += 1
+            return list(entry[1])
+        _cache_stats['misses'] += 1
+    # The versions were read first: a write landing during the query makes
+    # the entry stale at once instead of hiding the write.
+    rows = conn.execute(sql, params).fetchall()
+    with _cache_lock:
+        _analytics_cache[key] = (versions, rows)
+        _analytics_cache.move_to_end(key)
+        while len(_analytics_cache) > ANALYTICS_CACHE_SIZE:
+            _analytics_cache.popitem(last=False)
+    return list(rows)
+
+
+def analytics_cache_stats():
+    with _cache_lock:
+        lookups = _cache_stats['hits'] + _cache_stats['misses']
+        return {
+            'hits': _cache_stats['hits'],
+            'misses': _cache_stats['misses'],
+            'hit_rate': _cache_stats['hits'] / lookups if lookups else 0.0,
+            'entries': len(_analytics_cache),
+        }
+
+
+def clear_analytics_cache():
+    with _cache_lock:
+        _analytics_cache.clear()
+
+
+def table_columns(table_name):
+    cursor = get_connection().execute(f'PRAGMA table_info({table_name})')
+    return [column[1] for column in cursor.fetchall()]
+
+
+# Tables the app maintains for itself: SQLite's own, the FTS5 indexes and their
+# shadow tables, schema_version and the Monthly_Summary rollup.
+SQL_SELECT_USER_TABLES = '''
+SELECT name FROM sqlite_master
+WHERE type = 'table' AND name NOT GLOB 'sqlite_*' AND name NOT GLOB '*_fts*'
+  AND name NOT IN ('schema_version', 'Monthly_Summary')
+'''
+
+
+def list_tables():
+    """The tables holding the user's data, for the export window."""
+    cursor = get_connection().execute(SQL_SELECT_USER_TABLES)
+    return [row[0] for row in cursor.fetchall()]
+
+
+# Busca textual
+
+SEARCH_LIMIT = 500
+
+
+def full_text_available(table):
+    row = get_connection().execute("SELECT 1 FROM sqlite_master WHERE name = ?", (f'{table}_fts',)).fetchone()
+    return row is not None
+
+
+def full_text_query(search_term):
+    """Turn free text into an FTS5 query: every word must match as a prefix."""
+    words = re.findall(r'\w+', search_term)
+    if not words:
+        return None
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def search_ids(table, search_term, limit=SEARCH_LIMIT):
+    """Return the ids of the rows of Clientes, Despesas or Receitas matching the text, best first."""
+    query = full_text_query(search_term)
+    if query is None:
+        return []
+    cursor = get_connection().execute(
+        f'SELECT rowid FROM {table}_fts WHERE {table}_fts MATCH ? ORDER BY rank LIMIT ?', (query, limit))
+    return [row[0] for row in cursor.fetchall()]
+
+
+# Paginação por chave
+
+PAGE_SIZE = 200
+
+
+def keyset_queries(select, key_columns, descending=False):
+    """Build the page queries for `select` walked in key_columns order.
+
+    The rows after (or before) a page are found with a row-value comparison
+    on the last (or first) key already shown, so each page is a bounded index
+    range scan no matter how deep the user has scrolled, unlike OFFSET.
+    """
+    keys = ', '.join(key_columns)
+    marks = ', '.join('?' for _ in key_columns)
+    forward, backward = ('<', '>') if descending else ('>', '<')
+    order = ', '.join(f'{column} DESC' if descending else column for column in key_columns)
+    reverse_order = ', '.join(column if descending else f'{column} DESC' for column in key_columns)
+    return {
+        'first': f'{select} ORDER BY {order} LIMIT ?',
+        'from': f'{select} WHERE ({keys}) {forward}= ({marks}) ORDER BY {order} LIMIT ?',
+        'after': f'{select} WHERE ({keys}) {forward} ({marks}) ORDER BY {order} LIMIT ?',
+        'before': f'{select} WHERE ({keys}) {backward} ({marks}) ORDER BY {reverse_order} LIMIT ?',
+    }
+
+
+def fetch_page(queries, key=None, direction='after', limit=PAGE_SIZE):
+    """Fetch up to `limit` rows next to `key`, always in display order.
+
+    direction is 'after', 'before' or 'from' (the row with `key` onwards);
+    without a key the first page is returned.
+    """
+    conn = get_connection()
+    if key is None:
+        return conn.execute(queries['first'], (limit,)).fetchall()
+    rows = conn.execute(queries[direction], (*key, limit)).fetchall()
+    if direction == 'before':
+        rows.reverse()
+    return rows
+
+
+# Cabeçalho e itens
+
+SQL_LAST_INSERT_ROWID = 'SELECT last_insert_rowid()'
+
+
+def insert_with_lines(header_sql, header_params, line_sql, lines):
+    """Insert a header row and all of its lines in one transaction; return (header_id, line_ids).
+
+    lines are the line parameters without the header id, which is added in
+    front of each. All lines go in with a single executemany, and BEGIN
+    IMMEDIATE takes the write lock up front instead of half-way through.
+    """
+    conn = get_connection()
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        header_id = conn.execute(header_sql, header_params).lastrowid
+        conn.executemany(line_sql, [(header_id, *line) for line in lines])
+        # No other writer can get in while we hold the lock, so the new lines
+        # got consecutive rowids ending at last_insert_rowid().
+        last_id = conn.execute(SQL_LAST_INSERT_ROWID).fetchone()[0]
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return header_id, list(range(last_id - len(lines) + 1, last_id + 1)) if lines else []
+
+
+# Clientes
+
+SQL_CLIENT_ROWS = 'SELECT client_id, client_name, birthday, address FROM Clientes'
+SQL_SELECT_CLIENTS = SQL_CLIENT_ROWS + ' ORDER BY client_name'
+CLIENT_PAGES = keyset_queries(SQL_CLIENT_ROWS, ('client_name', 'client_id'))
+SQL_SEARCH_CLIENTS = '''
+SELECT c.client_id, c.client_name, c.birthday, c.address
+FROM Clientes_fts f
+JOIN Clientes c ON c.client_id = f.rowid
+WHERE Clientes_fts MATCH ?
+ORDER BY f.rank
+LIMIT ?
+'''
+SQL_SEARCH_CLIENTS_LIKE = '''
+SELECT client_id, client_name, birthday, address FROM Clientes WHERE client_name LIKE ? ORDER BY client_name
+'''
+SQL_SELECT_CLIENT_CHOICES = 'SELECT client_id, client_name FROM Clientes'
+SQL_SELECT_CLIENT_BY_NAME = 'SELECT client_id FROM Clientes WHERE client_name = ?'
+SQL_INSERT_CLIENT = 'INSERT INTO Clientes (client_name, birthday, address) VALUES (?, ?, ?)'
+SQL_UPDATE_CLIENT = 'UPDATE Clientes SET birthday = ?, address = ? WHERE client_id = ?'
+SQL_DELETE_CLIENT = 'DELETE FROM Clientes WHERE client_id = ?'
+# Bulk import: client_name is the natural key but is not UNIQUE (old data may
+# repeat names), so an upsert is an update by name followed by an insert of
+# the names still missing. Both look the name up on idx_clientes_name.
+SQL_UPDATE_CLIENT_BY_NAME = 'UPDATE Clientes SET birthday = ?, address = ? WHERE client_name = ?'
+SQL_INSERT_CLIENT_IF_NEW = '''
+INSERT INTO Clientes (client_name, birthday, address)
+SELECT ?, ?, ? WHERE NOT EXISTS (SELECT 1 FROM Clientes WHERE client_name = ?)
+'''
+SQL_SELECT_CLIENT_IDS = 'SELECT client_id, client_name FROM Clientes'
+# birthday_md is the 'MM-DD' part of birthday, filled in by triggers (see
+# migrations.create_birthday_index). The next birthdays from a given day are
+# the rows from that key to the end of the year, then from the start of the
+# year: two bounded range scans on idx_clientes_birthday_md.
+SQL_BIRTHDAYS_FROM = '''
+SELECT client_name, birthday FROM Clientes
+WHERE birthday_md >= ?
+ORDER BY birthday_md
+LIMIT ?
+'''
+SQL_BIRTHDAYS_BEFORE = '''
+SELECT client_name, birthday FROM Clientes
+WHERE birthday_md < ?
+ORDER BY birthday_md
+LIMIT ?
+'''
+
+
+def fetch_clients():
+    return get_connection().execute(SQL_SELECT_CLIENTS).fetchall()
+
+
+def search_clients(search_term):
+    query = full_text_query(search_term)
+    if query is None:
+        return fetch_clients()
+    if not full_text_available('Clientes'):
+        return get_connection().execute(SQL_SEARCH_CLIENTS_LIKE, ('%' + search_term + '%',)).fetchall()
+    return get_connection().execute(SQL_SEARCH_CLIENTS, (query, SEARCH_LIMIT)).fetchall()
+
+
+def fetch_clients_page(key=None, direction='after', limit=PAGE_SIZE):
+    return fetch_page(CLIENT_PAGES, key, direction, limit)
+
+
+def client_page_key(client):
+    return (client[1], client[0])
+
+
+def fetch_client_choices():
+    return get_connection().execute(SQL_SELECT_CLIENT_CHOICES).fetchall()
+
+
+def find_client_id(client_name):
+    row = get_connection().execute(SQL_SELECT_CLIENT_BY_NAME, (client_name,)).fetchone()
+    return row[0] if row else None
+
+
+def insert_client(client_name, birthday, address):
+    conn = get_connection()
+    with conn:
+        client_id = conn.execute(SQL_INSERT_CLIENT, (client_name, birthday, address)).lastrowid
+    bump_table_versions('Clientes')
+    return client_id
+
+
+def update_client(client_id, birthday, address):
+    conn = get_connection()
+    with conn:
+        conn.execute(SQL_UPDATE_CLIENT, (birthday, address, client_id))
+    bump_table_versions('Clientes')
+
+
+def delete_client(client_id):
+    conn = get_connection()
+    with conn:
+        conn.execute(SQL_DELETE_CLIENT, (client_id,))
+    bump_table_versions('Clientes')
+
+
+def fetch_upcoming_birthdays(month_day, n):
+    conn = get_connection()
+    birthdays = conn.execute(SQL_BIRTHDAYS_FROM, (month_day, n)).fetchall()
+    if len(birthdays) < n:
+        birthdays += conn.execute(SQL_BIRTHDAYS_BEFORE, (month_day, n - len(birthdays))).fetchall()
+    return birthdays
+
+
+# Ingredientes
+
+SQL_SELECT_ACTIVE_INGREDIENTS = '''
+SELECT ingredient_id, ingredient_name, price_per_unit, unit, quantity FROM Ingredientes WHERE is_active = 1
+'''
+SQL_SELECT_INGREDIENT_CHOICES = '''
+SELECT ingredient_id, ingredient_name, price_per_unit FROM Ingredientes WHERE is_active = 1
+'''
+SQL_SELECT_INGREDIENT_BY_NAME = 'SELECT ingredient_id FROM Ingredientes WHERE ingredient_name = ?'
+SQL_INSERT_INGREDIENT = '''
+INSERT INTO Ingredientes (ingredient_name, price_per_unit, unit, quantity) VALUES (?, ?, ?, ?)
+'''
+SQL_UPDATE_INGREDIENT = '''
+UPDATE Ingredientes
+SET price_per_unit = ?, unit = ?, quantity = ?, is_active = 1
+WHERE ingredient_id = ?
+'''
+SQL_DEACTIVATE_INGREDIENT = 'UPDATE Ingredientes SET is_active = 0 WHERE ingredient_id = ?'
+# A price update reprices these recipes (see migrations.create_recipe_cost_triggers).
+SQL_COUNT_RECIPES_USING_INGREDIENT = 'SELECT COUNT(DISTINCT recipe_id) FROM Recipe_Ingredients WHERE ingredient_id = ?'
+# Bulk import: ingredient_name is UNIQUE, so an import row either adds the
+# ingredient or refreshes (and reactivates) the existing one.
+SQL_UPSERT_INGREDIENT = '''
+INSERT INTO Ingredientes (ingredient_name, price_per_unit, unit, quantity) VALUES (?, ?, ?, ?)
+ON CONFLICT(ingredient_name) DO UPDATE SET
+    price_per_unit = excluded.price_per_unit,
+    unit = excluded.unit,
+    quantity = excluded.quantity,
+    is_active = 1
+'''
+
+
+def fetch_active_ingredients():
+    return get_connection().execute(SQL_SELECT_ACTIVE_INGREDIENTS).fetchall()
+
+
+def fetch_ingredient_choices():
+    return get_connection().execute(SQL_SELECT_INGREDIENT_CHOICES).fetchall()
+
+
+def find_ingredient_id(ingredient_name):
+    row = get_connection().execute(SQL_SELECT_INGREDIENT_BY_NAME, (ingredient_name,)).fetchone()
+    return row[0] if row else None
+
+
+def insert_ingredient(ingredient_name, price_per_unit, unit, quantity):
+    conn = get_connection()
+    with conn:
+        return conn.execute(SQL_INSERT_INGREDIENT, (ingredient_name, price_per_unit, unit, quantity)).lastrowid
+
+
+def update_ingredient(ingredient_id, price_per_unit, unit, quantity):
+    """Update the ingredient and return how many recipes use it (their cost follows the new price)."""
+    conn = get_connection()
+    with conn:
+        conn.execute(SQL_UPDATE_INGREDIENT, (price_per_unit, unit, quantity, ingredient_id))
+        return conn.execute(SQL_COUNT_RECIPES_USING_INGREDIENT, (ingredient_id,)).fetchone()[0]
+
+
+def deactivate_ingredient(ingredient_id):
+    conn = get_connection()
+    with conn:
+        return conn.execute(SQL_DEACTIVATE_INGREDIENT, (ingredient_id,)).rowcount
+
+
+# Receitas
+
+SQL_SELECT_RECIPES = '''
+SELECT recipe_id, recipe_name, total_price, selling_price, mao_de_obra, gas_agua_luz, porcoes FROM Receitas
+'''
+SQL_SELECT_RECIPE_CHOICES = 'SELECT recipe_id, recipe_name, selling_price FROM Receitas'
+# Inputs of costing.CostModel: every recipe line and every ingredient price
+# (inactive ingredients too, older recipes still use them).
+SQL_SELECT_RECIPE_LINES = 'SELECT recipe_id, ingredient_id, quantity FROM Recipe_Ingredients'
+SQL_SELECT_INGREDIENT_PRICES = 'SELECT ingredient_id, price_per_unit FROM Ingredientes'
+SQL_INSERT_RECIPE = '''
+INSERT INTO Receitas (recipe_name, total_price, selling_price, mao_de_obra, gas_agua_luz, porcoes)
+VALUES (?, ?, ?, ?, ?, ?)
+'''
+SQL_INSERT_RECIPE_INGREDIENT = 'INSERT INTO Recipe_Ingredients (recipe_id, ingredient_id, quantity) VALUES (?, ?, ?)'
+SQL_DELETE_RECIPE = 'DELETE FROM Receitas WHERE recipe_id = ?'
+SQL_DELETE_RECIPE_INGREDIENTS = 'DELETE FROM Recipe_Ingredients WHERE recipe_id = ?'
+
+
+def fetch_recipes():
+    return get_connection().execute(SQL_SELECT_RECIPES).fetchall()
+
+
+def fetch_recipe_choices():
+    return get_connection().execute(SQL_SELECT_RECIPE_CHOICES).fetchall()
+
+
+def fetch_cost_inputs():
+    conn = get_connection()
+    return (conn.execute(SQL_SELECT_RECIPES).fetchall(),
+            conn.execute(SQL_SELECT_RECIPE_LINES).fetchall(),
+            conn.execute(SQL_SELECT_INGREDIENT_PRICES).fetchall())
+
+
+def insert_recipe(recipe_name, total_price, selling_price, mao_de_obra, gas_agua_luz, porcoes, ingredients):
+    """ingredients are (ingredient_id, quantity) pairs; returns (recipe_id, Recipe_Ingredients ids)."""
+    return insert_with_lines(SQL_INSERT_RECIPE,
+                             (recipe_name, total_price, selling_price, mao_de_obra, gas_agua_luz, porcoes),
+                             SQL_INSERT_RECIPE_INGREDIENT, ingredients)
+
+
+def delete_recipe(recipe_id):
+    conn = get_connection()
+    with conn:
+        conn.execute(SQL_DELETE_RECIPE, (recipe_id,))
+        conn.execute(SQL_DELETE_RECIPE_INGREDIENTS, (recipe_id,))
+
+
+# Compras
+
+SQL_SELECT_PURCHASES = '''
+SELECT c.purchase_id, cl.client_name, c.purchase_date, c.total_amount
+FROM Compras c
+JOIN Clientes cl ON c.client_id = cl.client_id
+'''
+# Newest purchases first.
+PURCHASE_PAGES = keyset_queries(SQL_SELECT_PURCHASES, ('c.purchase_id',), descending=True)
+SQL_INSERT_PURCHASE = 'INSERT INTO Compras (client_id, purchase_date, total_amount) VALUES (?, ?, ?)'
+SQL_INSERT_PURCHASE_ITEM = 'INSERT INTO Purchase_Items (purchase_id, recipe_id, quantity) VALUES (?, ?, ?)'
+SQL_DELETE_PURCHASE_ITEMS = 'DELETE FROM Purchase_Items WHERE purchase_id = ?'
+SQL_DELETE_PURCHASE = 'DELETE FROM Compras WHERE purchase_id = ?'
+# Bulk import keeps the source system's purchase_id when there is one, so
+# importing the same file twice updates instead of duplicating.
+# Imported purchases keep their source id in external_id; without one this is
+# a plain insert with a new purchase_id.
+SQL_UPSERT_PURCHASE = '''
+INSERT INTO Compras (external_id, client_id, purchase_date, total_amount) VALUES (?, ?, ?, ?)
+ON CONFLICT(external_id) DO UPDATE SET
+    client_id = excluded.client_id,
+    purchase_date = excluded.purchase_date,
+    total_amount = excluded.total_amount
+'''
+# Triggers and secondary indexes of a table (automatic indexes have no SQL).
+# Unique indexes stay: upserts need them as conflict targets.
+SQL_SELECT_TABLE_UPKEEP = '''
+SELECT type, name, sql FROM sqlite_master
+WHERE tbl_name = ? AND type IN ('trigger', 'index') AND sql IS NOT NULL
+  AND sql NOT LIKE 'CREATE UNIQUE INDEX%'
+'''
+
+
+def fetch_purchases():
+    return get_connection().execute(SQL_SELECT_PURCHASES).fetchall()
+
+
+def fetch_purchases_page(key=None, direction='after', limit=PAGE_SIZE):
+    return fetch_page(PURCHASE_PAGES, key, direction, limit)
+
+
+def purchase_page_key(purchase):
+    return (purchase[0],)
+
+
+def insert_purchase(client_id, purchase_date, total_amount, items):
+    """items are (recipe_id, quantity) pairs; returns (purchase_id, Purchase_Items ids)."""
+    ids = insert_with_lines(SQL_INSERT_PURCHASE, (client_id, purchase_date, total_amount),
+                            SQL_INSERT_PURCHASE_ITEM, items)
+    bump_table_versions('Compras')
+    return ids
+
+
+def delete_purchase(purchase_id):
+    conn = get_connection()
+    with conn:
+        conn.execute(SQL_DELETE_PURCHASE_ITEMS, (purchase_id,))
+        conn.execute(SQL_DELETE_PURCHASE, (purchase_id,))
+    bump_table_versions('Compras')
+
+
+# Despesas
+
+SQL_EXPENSE_ROWS = 'SELECT expense_id, description, date, amount, type FROM Despesas'
+SQL_SELECT_EXPENSES = SQL_EXPENSE_ROWS + ' ORDER BY date'
+EXPENSE_PAGES = keyset_queries(SQL_EXPENSE_ROWS, ('date', 'expense_id'))
+SQL_SEARCH_EXPENSES = '''
+SELECT d.expense_id, d.description, d.date, d.amount, d.type
+FROM Despesas_fts f
+JOIN Despesas d ON d.expense_id = f.rowid
+WHERE Despesas_fts MATCH ?
+ORDER BY f.rank
+LIMIT ?
+'''
+SQL_SEARCH_EXPENSES_LIKE = '''
+SELECT expense_id, description, date, amount, type FROM Despesas
+WHERE description LIKE ? OR type LIKE ? ORDER BY date
+'''
+SQL_SELECT_ALL_EXPENSES = 'SELECT expense_id, description, date, amount, type FROM Despesas'
+SQL_INSERT_EXPENSE = 'INSERT INTO Despesas (description, date, amount, type) VALUES (?, ?, ?, ?)'
+SQL_DELETE_EXPENSE = 'DELETE FROM Despesas WHERE expense_id = ?'
+
+
+def fetch_expenses(search_term=""):
+    conn = get_connection()
+    query = full_text_query(search_term)
+    if query is None:
+        return conn.execute(SQL_SELECT_EXPENSES).fetchall()
+    if not full_text_available('Despesas'):
+        return conn.execute(SQL_SEARCH_EXPENSES_LIKE, (f"%{search_term}%", f"%{search_term}%")).fetchall()
+    return conn.execute(SQL_SEARCH_EXPENSES, (query, SEARCH_LIMIT)).fetchall()
+
+
+def fetch_expenses_page(key=None, direction='after', limit=PAGE_SIZE):
+    return fetch_page(EXPENSE_PAGES, key, direction, limit)
+
+
+def expense_page_key(expense):
+    return (expense[2], expense[0])
+
+
+def fetch_all_expenses():
+    return get_connection().execute(SQL_SELECT_ALL_EXPENSES).fetchall()
+
+
+def insert_expense(description, date, amount, expense_type):
+    conn = get_connection()
+    with conn:
+        expense_id = conn.execute(SQL_INSERT_EXPENSE, (description, date, amount, expense_type)).lastrowid
+    bump_table_versions('Despesas')
+    return expense_id
+
+
+def delete_expense(expense_id):
+    conn = get_connection()
+    with conn:
+        conn.execute(SQL_DELETE_EXPENSE, (expense_id,))
+    bump_table_versions('Despesas')
+
+
+# Relatórios
+
+# Monthly_Summary holds one row per month and category, kept up to date by
+# triggers on Compras and Despesas (see migrations.create_monthly_summary).
+SQL_MONTHLY_EXPENSES = '''
+SELECT month, category, amount FROM Monthly_Summary
+WHERE source = 'Despesas' AND month BETWEEN ? AND ?
+ORDER BY month
+'''
+SQL_MONTHLY_PURCHASES = '''
+SELECT month, amount FROM Monthly_Summary
+WHERE source = 'Compras' AND month BETWEEN ? AND ?
+ORDER BY month
+'''
+# Clientes.purchases / total_amount_spent / amount_spent_month are maintained
+# by triggers on Compras (see migrations.create_client_counters).
+# amount_spent_month always refers to the month stored in spent_month.
+SQL_TOP_CUSTOMERS = '''
+SELECT client_name, total_amount_spent
+FROM Clientes
+WHERE purchases > 0
+ORDER BY total_amount_spent DESC
+LIMIT ?
+'''
+SQL_TOP_CUSTOMERS_FOR_MONTH = '''
+SELECT client_name, amount_spent_month
+FROM Clientes
+WHERE spent_month = ? AND amount_spent_month > 0
+ORDER BY amount_spent_month DESC
+LIMIT ?
+'''
+SQL_ROLL_OVER_CLIENT_MONTH = '''
+UPDATE Clientes
+SET spent_month = ?,
+    amount_spent_month = COALESCE((SELECT SUM(total_amount) FROM Compras
+                                   WHERE Compras.client_id = Clientes.client_id
+                                   AND purchase_date >= ? AND purchase_date < ?), 0)
+WHERE spent_month IS NOT ?
+'''
+
+_counters_month = {'month': None}
+
+
+# Both monthly reports take an inclusive range of 'YYYY-MM' months.
+# Monthly_Summary and the Clientes counters follow Compras and Despesas
+# through triggers, so the reports are cached on those tables' versions.
+def fetch_monthly_expenses(start_month, end_month):
+    return cached_query(SQL_MONTHLY_EXPENSES, (start_month, end_month), ('Despesas',))
+
+
+def fetch_monthly_purchases(start_month, end_month):
+    return cached_query(SQL_MONTHLY_PURCHASES, (start_month, end_month), ('Compras',))
+
+
+def fetch_top_customers(n):
+    return cached_query(SQL_TOP_CUSTOMERS, (n,), ('Compras', 'Clientes'))
+
+
+def month_bounds(month):
+    """Return the ISO [first day, first day of next month) range for 'YYYY-MM'."""
+    year, month_number = map(int, month.split('-'))
+    if month_number == 12:
+        return f"{year}-12-01", f"{year + 1}-01-01"
+    return f"{year}-{month_number:02d}-01", f"{year}-{month_number + 1:02d}-01"
+
+
+def roll_over_client_counters(month):
+    """Point every client's amount_spent_month at 'YYYY-MM', recomputing stale rows."""
+    if _counters_month['month'] == month:
+        return
+    start, end = month_bounds(month)
+    conn = get_connection()
+    with conn:
+        conn.execute(SQL_ROLL_OVER_CLIENT_MONTH, (month, start, end, month))
+    bump_table_versions('Clientes')
+    _counters_month['month'] = month
+
+
+def fetch_top_customers_for_month(month, n):
+    roll_over_client_counters(month)
+    return cached_query(SQL_TOP_CUSTOMERS_FOR_MONTH, (month, n), ('Compras', 'Clientes'))
@@ -1,23 +1,12 @@
-import sqlite3
 from tkinter import messagebox
 
 from ingredients import update_ingredient_list
 
-import sqlite3
-
-DATABASE_PATH = 'food_supplier.db'
-
-def connect_to_db():
-    try:
-        conn = sqlite3.connect(DATABASE_PATH)
-        return conn
-    except sqlite3.Error as e:
-        print(f"Erro ao conectar-se ao banco de dados: {e}")
-        return None
+import data_access
 
 def create_tables():
-    conn = connect_to_db()
-    if conn:
+    conn = data_access.get_connection()
+    with conn:
         cursor = conn.cursor()
         # Create Ingredientes table with the new 'quantity' column
         cursor.execute('''
@@ -87,19 +76,8 @@ def create_tables():
         if 'quantity' not in columns:
             cursor.execute("ALTER TABLE Ingredientes ADD COLUMN quantity REAL NOT NULL DEFAULT 0.0")
 
-        conn.commit()
-        conn.close()
-
 def add_ingredient_to_db(nome, unidade, preco_total, quantidade):
-    conn = connect_to_db()
-    if conn:
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT INTO Ingredientes (ingredient_name, price_per_unit, unit, quantity)
-            VALUES (?, ?, ?, ?)
-        ''', (nome, preco_total, unidade, quantidade))
-        conn.commit()
-        conn.close()
+    data_access.insert_ingredient(nome, preco_total, unidade, quantidade)
 
 def add_or_update_ingredient(ingredient_name, price_per_unit, unit, quantity, ingredient_listbox, status_label):
     if not ingredient_name or not price_per_unit or not unit or not quantity:
@@ -112,39 +90,22 @@ def add_or_update_ingredient(ingredient_name, price_per_unit, unit, quantity, in
         messagebox.showwarning("Erro de Entrada", "O preço e a quantidade devem ser números")
         return
 
-    conn = connect_to_db()
-    cursor = conn.cursor()
+    ingredient_id = data_access.find_ingredient_id(ingredient_name)
 
-    cursor.execute('''
-    SELECT ingredient_id FROM Ingredientes WHERE ingredient_name = ?
-    ''', (ingredient_name,))
-    ingredient = cursor.fetchone()
-
-    if ingredient:
-        cursor.execute('''
-        UPDATE Ingredientes
-        SET price_per_unit = ?, unit = ?, quantity = ?, is_active = 1
-        WHERE ingredient_id = ?
-        ''', (price_per_unit, unit, quantity, ingredient[0]))
+    if ingredient_id is not None:
+        data_access.update_ingredient(ingredient_id, price_per_unit, unit, quantity)
         messagebox.showinfo("Sucesso", "Ingrediente atualizado com sucesso!")
     else:
-        cursor.execute('''
-        INSERT INTO Ingredientes (ingredient_name, price_per_unit, unit, quantity) VALUES (?, ?, ?, ?)
-        ''', (ingredient_name, price_per_unit, unit, quantity))
+        data_access.insert_ingredient(ingredient_name, price_per_unit, unit, quantity)
         messagebox.showinfo("Sucesso", "Ingrediente adicionado com sucesso!")
 
-    conn.commit()
-    conn.close()
     update_ingredient_list(ingredient_listbox)
     status_label.config(text=f"Ingrediente '{ingredient_name}' adicionado/atualizado com sucesso.")
 
 def fetch_ingredients():
-    conn = connect_to_db()
-    cursor = conn.cursor()
-    cursor.execute('SELECT ingredient_name, unit, price_per_unit, quantity FROM Ingredientes')
-    ingredients = cursor.fetchall()
-    conn.close()
-    return ingredients
+    cursor = data_access.get_connection().execute(
+        'SELECT ingredient_name, unit, price_per_unit, quantity FROM Ingredientes')
+    return cursor.fetchall()
 
 def display_ingredients():
     ingredients = fetch_ingredients()
@@ -154,17 +115,9 @@ def display_ingredients():
         print(f"Nome: {nome}, Unidade: {unidade}, Preço Total: {preco_total}, Quantidade: {quantidade}, Preço por Unidade: {preco_por_unidade:.2f}")
 
 def update_database_schema():
-    conn = sqlite3.connect(DATABASE_PATH)
-    cursor = conn.cursor()
-
-    cursor.execute('PRAGMA table_info(Despesas)')
-    columns = [info[1] for info in cursor.fetchall()]
+    columns = data_access.table_columns('Despesas')
 
     if 'expense_type' not in columns:
-        cursor.execute('ALTER TABLE Despesas ADD COLUMN expense_type TEXT NOT NULL DEFAULT "General"')
-
-    conn.commit()
-    conn.close()
-
-# Ensure to run the create_tables function to set up the database schema
-create_tables()
+        conn = data_access.get_connection()
+        with conn:
+            conn.execute('ALTER TABLE Despesas ADD COLUMN expense_type TEXT NOT NULL DEFAULT "General"')
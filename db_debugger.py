@@ -1,18 +1,10 @@
 import sqlite3
 
-DATABASE_PATH = 'food_supplier.db'
-
-def connect_to_db():
-    try:
-        conn = sqlite3.connect(DATABASE_PATH)
-        return conn
-    except sqlite3.Error as e:
-        print(f"Erro ao conectar-se ao banco de dados: {e}")
-        return None
+import data_access
 
 def create_tables():
-    conn = connect_to_db()
-    if conn:
+    conn = data_access.get_connection()
+    with conn:
         cursor = conn.cursor()
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS Ingredientes (
@@ -81,19 +73,20 @@ def create_tables():
         if 'quantity' not in columns:
             cursor.execute("ALTER TABLE Ingredientes ADD COLUMN quantity REAL NOT NULL DEFAULT 0.0")
 
-        conn.commit()
-        conn.close()
+def connect_read_only():
+    # Inspecting the database must never change it: no migrations, no PRAGMAs.
+    return sqlite3.connect(f'file:{data_access.DATABASE_PATH}?mode=ro', uri=True)
+
 
 def check_schema():
-    conn = connect_to_db()
-    cursor = conn.cursor()
-    cursor.execute("PRAGMA table_info(Recipes)")
-    columns = cursor.fetchall()
-    conn.close()
-    return columns
+    conn = connect_read_only()
+    try:
+        return conn.execute("PRAGMA table_info(Recipes)").fetchall()
+    finally:
+        conn.close()
+
 
 if __name__ == "__main__":
-    create_tables()
     columns = check_schema()
     print("Recipes Table Schema:")
     for column in columns:
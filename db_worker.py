@@ -0,0 +1,187 @@
+import queue
+import threading
+from tkinter import messagebox
+
+import data_access
+
+# How often the Tk thread looks for finished jobs while any are pending.
+POLL_MS = 30
+
+_jobs = queue.Queue()
+_results = queue.Queue()
+_lock = threading.Lock()
+# Held while a job's connection is attached or detached, and around
+# interrupt(), so an interrupt only ever reaches the job it was meant for.
+_running_lock = threading.Lock()
+_thread = None
+_pending = {}  # toplevel -> jobs submitted from it and not yet delivered
+_busy_listeners = {}  # toplevel -> callbacks taking busy (bool)
+_polling = {'root': None}
+
+
+class Job:
+    def __init__(self, window, fn, args, on_done, on_error, profile, cancellable):
+        self.window = window
+        self.fn = fn
+        self.args = args
+        self.on_done = on_done
+        self.on_error = on_error
+        self.profile = profile
+        self.cancellable = cancellable
+        self.cancelled = False
+        self.finished = False
+        self.connection = None
+
+    def cancel(self):
+        """Drop the job: it is skipped if still queued and its SQL is interrupted if running."""
+        with _running_lock:
+            self.cancelled = True
+            if self.connection is not None:
+                self.connection.interrupt()
+
+
+def report_error(error):
+    messagebox.showerror("Erro", f"Erro ao acessar o banco de dados: {error}")
+
+
+def submit(widget, fn, *args, on_done=None, on_error=None, profile=None, cancellable=True):
+    """Run fn(*args) on the database thread and hand the result to on_done on the Tk thread.
+
+    The worker thread has its own connection (data_access.get_connection() is
+    per thread) and runs jobs one at a time in the order they were submitted,
+    so a write followed by a refresh of the same list is seen in that order.
+    Callbacks of jobs whose window was closed are not called. Closing the
+    window cancels its pending jobs unless cancellable is False, which writes
+    pass so they still land; their errors are then reported without a window.
+    """
+    window = widget.winfo_toplevel()
+    job = Job(window, fn, args, on_done, on_error or report_error, profile, cancellable)
+    with _lock:
+        _pending.setdefault(window, []).append(job)
+    _notify(window)
+    _start_thread()
+    _jobs.put(job)
+    _schedule_poll(widget)
+    return job
+
+
+def cancel_all(widget):
+    with _lock:
+        jobs = list(_pending.get(widget.winfo_toplevel(), []))
+    for job in jobs:
+        if job.cancellable:
+            job.cancel()
+
+
+def is_busy(widget):
+    with _lock:
+        return bool(_pending.get(widget.winfo_toplevel()))
+
+
+def watch_busy(window, progressbar=None):
+    """Show a wait cursor (and run an indeterminate progress bar) while window has jobs pending."""
+    def on_busy(busy):
+        window.config(cursor='watch' if busy else '')
+        if progressbar is not None:
+            if busy:
+                progressbar.start(10)
+            else:
+                progressbar.stop()
+
+    _busy_listeners.setdefault(window, []).append(on_busy)
+    window.bind('<Destroy>', lambda event: _forget(window) if event.widget is window else None, add='+')
+
+
+def _forget(window):
+    cancel_all(window)
+    _busy_listeners.pop(window, None)
+
+
+def _notify(window):
+    busy = is_busy(window)
+    for listener in _busy_listeners.get(window, []):
+        listener(busy)
+
+
+def _start_thread():
+    global _thread
+    with _lock:
+        if _thread is None:
+            _thread = threading.Thread(target=_work, name='db-worker', daemon=True)
+            _thread.start()
+
+
+def _work():
+    profile = data_access.DEFAULT_PROFILE
+    while True:
+        job = _jobs.get()
+        result, error = None, None
+        try:
+            # A job cancelled before it got here is skipped.
+            with _running_lock:
+                if not job.cancelled:
+                    job.connection = data_access.get_connection()
+            if job.connection is not None:
+                wanted = job.profile or data_access.DEFAULT_PROFILE
+                if wanted != profile:
+                    data_access.use_profile(wanted)
+                    profile = wanted
+                result = job.fn(*job.args)
+        except Exception as e:
+            error = e
+        finally:
+            with _running_lock:
+                job.connection = None
+        _results.put((job, result, error))
+
+
+def _schedule_poll(widget):
+    if _polling['root'] is None:
+        root = widget.nametowidget('.')
+        _polling['root'] = root
+        root.after(POLL_MS, _poll)
+
+
+def _poll():
+    root = _polling['root']
+    try:
+        _deliver_results()
+    finally:
+        # Keep polling even if a callback raised, or later jobs would never land.
+        with _lock:
+            waiting = bool(_pending)
+        if waiting:
+            root.after(POLL_MS, _poll)
+        else:
+            _polling['root'] = None
+
+
+def _deliver_results():
+    while True:
+        try:
+            job, result, error = _results.get_nowait()
+        except queue.Empty:
+            return
+        job.finished = True
+        with _lock:
+            jobs = _pending.get(job.window, [])
+            if job in jobs:
+                jobs.remove(job)
+            if not jobs:
+                _pending.pop(job.window, None)
+        if not job.window.winfo_exists():
+            if error is not None and not job.cancelled and not job.cancellable:
+                report_error(error)
+            continue
+        _notify(job.window)
+        if job.cancelled:
+            continue
+        if error is not None:
+            job.on_error(error)
+        elif job.on_done is not None:
+            job.on_done(result)
+
+
+def runner(widget):
+    """A SearchController runner that queries on the database thread."""
+    return lambda fn, term, on_done: submit(widget, fn, term, on_done=on_done)
@@ -1,24 +1,16 @@
-import sqlite3
 import tkinter as tk
 from tkinter import messagebox, ttk
 from PIL import Image, ImageTk
 import os
 from ui_config import apply_styles
-import re
 from datetime import datetime
 import pandas as pd
 
-DATABASE_PATH = 'food_supplier.db'
-
-
-def connect_to_db():
-    try:
-        conn = sqlite3.connect(DATABASE_PATH)
-        return conn
-    except sqlite3.Error as e:
-        log_error(f"Erro de Conexão: {e}")
-        messagebox.showerror("Erro de Conexão", f"Erro ao conectar-se ao banco de dados: {e}")
-        return None
+import data_access
+import db_worker
+from search_controller import SearchController
+from virtual_list import VirtualListbox
+from validation import validate_date
 
 
 def log_error(error_message):
@@ -26,32 +18,17 @@ def log_error(error_message):
         error_log.write(f"{datetime.now()}: {error_message}\n")
 
 
-def initialize_database():
-    conn = sqlite3.connect(DATABASE_PATH)
-    cursor = conn.cursor()
-
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS Despesas (
-        expense_id INTEGER PRIMARY KEY,
-        description TEXT NOT NULL,
-        date TEXT NOT NULL,
-        amount REAL NOT NULL,
-        type TEXT NOT NULL
-    )
-    ''')
-
-    conn.commit()
-    conn.close()
+# Despesas.date is stored as ISO YYYY-MM-DD so it sorts and range-scans on the
+# index; the window still reads and shows DD/MM/YYYY.
+def to_iso_date(date_text):
+    return datetime.strptime(date_text, '%d/%m/%Y').strftime('%Y-%m-%d')
 
 
-def validate_date(date_text):
+def to_display_date(iso_date):
     try:
-        if re.match(r'^\d{2}/\d{2}/\d{4}$', date_text):
-            datetime.strptime(date_text, '%d/%m/%Y')
-            return True
-        return False
+        return datetime.strptime(iso_date, '%Y-%m-%d').strftime('%d/%m/%Y')
     except ValueError:
-        return False
+        return iso_date
 
 
 def add_expense(description, date, amount, expense_type, status_label, expense_listbox):
@@ -67,34 +44,29 @@ def add_expense(description, date, amount, expense_type, status_label, expense_l
         messagebox.showwarning("Erro de Entrada", "O valor deve ser um número")
         return
 
-    conn = connect_to_db()
-    cursor = conn.cursor()
-
-    cursor.execute('''
-    INSERT INTO Despesas (description, date, amount, type) VALUES (?, ?, ?, ?)
-    ''', (description, date, amount, expense_type))
+    data_access.insert_expense(description, to_iso_date(date), amount, expense_type)
     messagebox.showinfo("Sucesso", "Despesa adicionada com sucesso!")
 
-    conn.commit()
-    conn.close()
     update_expense_list(expense_listbox)
     status_label.config(text=f"Despesa '{description}' adicionada com sucesso.")
 
 
+def format_expense(expense):
+    return f"{expense[0]} - {expense[1]} - {to_display_date(expense[2])} - R${expense[3]:.2f} - {expense[4]}"
+
+
+def find_expenses(search_term):
+    # No words to search for: page through the whole table instead.
+    if data_access.full_text_query(search_term) is None:
+        return None
+    return data_access.fetch_expenses(search_term)
+
+
 def update_expense_list(listbox, search_term=""):
-    conn = connect_to_db()
-    cursor = conn.cursor()
     if search_term:
-        cursor.execute('''
-        SELECT * FROM Despesas WHERE description LIKE ? OR type LIKE ? ORDER BY date
-        ''', (f"%{search_term}%", f"%{search_term}%"))
+        listbox.show_rows(find_expenses(search_term))
     else:
-        cursor.execute('SELECT * FROM Despesas ORDER BY date')
-    expenses = cursor.fetchall()
-    listbox.delete(0, tk.END)
-    for expense in expenses:
-        listbox.insert(tk.END, f"{expense[0]} - {expense[1]} - {expense[2]} - R${expense[3]:.2f} - {expense[4]}")
-    conn.close()
+        listbox.refresh()
 
 
 def delete_expense(expense_listbox, status_label):
@@ -104,11 +76,7 @@ def delete_expense(expense_listbox, status_label):
         return
     expense_id = int(expense_listbox.get(selected_item[0]).split(' ')[0])
     if tk.messagebox.askyesno("Confirmar Exclusão", "Você tem certeza que deseja excluir esta despesa?"):
-        conn = connect_to_db()
-        cursor = conn.cursor()
-        cursor.execute('DELETE FROM Despesas WHERE expense_id = ?', (expense_id,))
-        conn.commit()
-        conn.close()
+        data_access.delete_expense(expense_id)
         messagebox.showinfo("Sucesso", "Despesa excluída com sucesso!")
         update_expense_list(expense_listbox)
         status_label.config(text=f"Despesa ID '{expense_id}' excluída com sucesso.")
@@ -123,11 +91,8 @@ def format_date(event):
 
 
 def export_to_excel(listbox):
-    conn = connect_to_db()
-    cursor = conn.cursor()
-    cursor.execute('SELECT * FROM Despesas')
-    expenses = cursor.fetchall()
-    conn.close()
+    expenses = [(expense_id, description, to_display_date(date), amount, expense_type)
+                for expense_id, description, date, amount, expense_type in data_access.fetch_all_expenses()]
 
     df = pd.DataFrame(expenses, columns=["ID", "Descrição", "Data", "Valor", "Tipo"])
     df.to_excel('despesas.xlsx', index=False)
@@ -135,11 +100,11 @@ def export_to_excel(listbox):
 
 
 def open_expenses_window(root):
-    initialize_database()
     expenses_window = tk.Toplevel(root)
     expenses_window.title("Despesas")
     expenses_window.geometry("600x500")
     expenses_window.minsize(600, 500)
+    db_worker.watch_busy(expenses_window)
 
     # Create the main frame
     main_frame = ttk.Frame(expenses_window, padding="20 20 20 20", style="Main.TFrame")
@@ -205,12 +170,16 @@ def open_expenses_window(root):
     ttk.Label(search_frame, text="Buscar:").grid(row=0, column=0, sticky="e", padx=(0, 10))
     search_entry = ttk.Entry(search_frame)
     search_entry.grid(row=0, column=1, sticky="ew")
-    search_entry.bind('<KeyRelease>', lambda event: update_expense_list(expense_listbox, search_entry.get()))
+    search = SearchController(search_entry, find_expenses, lambda expenses: expense_listbox.show_rows(expenses),
+                              lambda expense: f"{expense[1]} {expense[4]}", runner=db_worker.runner(search_entry))
+    search_entry.bind('<KeyRelease>', lambda event: search.schedule(search_entry.get()))
+    search_entry.bind('<Return>', lambda event: search.run_now(search_entry.get()))
 
     search_frame.grid_columnconfigure(1, weight=1)
 
     # Expense list
-    expense_listbox = tk.Listbox(main_frame, width=50, height=10)
+    expense_listbox = VirtualListbox(main_frame, data_access.fetch_expenses_page, data_access.expense_page_key,
+                                     format_expense, width=50, height=10)
     expense_listbox.grid(row=4, column=0, columnspan=2, pady=20, sticky="nsew")
 
     main_frame.grid_rowconfigure(4, weight=1)
@@ -1,10 +1,26 @@
 import tkinter as tk
 from tkinter import messagebox, ttk, filedialog
-import sqlite3
-import pandas as pd
+import csv
+import gzip
+import multiprocessing
+import os
+import pickle
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, wait
+import xlsxwriter
 from datetime import datetime
 from ui_config import apply_styles, apply_color_palette
 
+import data_access
+import db_worker
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
 
 def validate_date_format(date_text):
     try:
@@ -22,45 +38,330 @@ def validate_date_range(start_date, end_date):
     return True, ""
 
 
-def export_data_to_excel(db_path, tables, start_date, end_date, file_path):
-    conn = sqlite3.connect(db_path)
-    writer = pd.ExcelWriter(file_path, engine='xlsxwriter')
+# Rows read from the cursor per fetchmany(); with xlsxwriter's constant_memory
+# mode only this chunk and the current sheet row are held in memory.
+EXPORT_CHUNK_ROWS = 5000
+# Rows per Excel worksheet, header included.
+EXCEL_MAX_ROWS = 1048576
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+class ExportProgress:
+    """Rows written so far, shared between the export thread and the window."""
+
+    def __init__(self):
+        self.done = 0
+        self.total = 0
+        self.cancelled = False
+
+    def add(self, rows):
+        self.done += rows
+
+
+# The date range applies to these tables; Purchase_Items follows the date of
+# its purchase. Other tables are exported whole.
+DATE_FILTERS = {
+    'Compras': 'purchase_date BETWEEN ? AND ?',
+    'Despesas': 'date BETWEEN ? AND ?',
+    'Purchase_Items': 'purchase_id IN (SELECT purchase_id FROM Compras WHERE purchase_date BETWEEN ? AND ?)',
+}
+
+
+def table_query(table, start_date, end_date):
+    query = f'SELECT * FROM {table}'
+    params = ()
+    if table in DATE_FILTERS:
+        query += f' WHERE {DATE_FILTERS[table]}'
+        params = (start_date, end_date)
+    return query, params
 
+
+def count_rows(tables, start_date, end_date):
+    conn = data_access.get_connection()
+    total = 0
     for table in tables:
-        query = f'SELECT * FROM {table}'
-        if 'date' in get_column_names(conn, table):
-            query += f" WHERE date BETWEEN '{start_date}' AND '{end_date}'"
+        query, params = table_query(table, start_date, end_date)
+        total += conn.execute(f'SELECT COUNT(*) FROM ({query})', params).fetchone()[0]
+    return total
+
+
+def read_table(table, start_date, end_date, progress):
+    """Yield the column names, then the table's rows in chunks of EXPORT_CHUNK_ROWS."""
+    query, params = table_query(table, start_date, end_date)
+    cursor = data_access.get_connection().execute(query, params)
+    yield [column[0] for column in cursor.description]
+    while True:
+        rows = cursor.fetchmany(EXPORT_CHUNK_ROWS)
+        if not rows:
+            return
+        yield rows
+        progress.add(len(rows))
+        if progress.cancelled:
+            raise ExportCancelled()
 
-        df = pd.read_sql_query(query, conn)
-        df.to_excel(writer, sheet_name=table, index=False)
 
-    writer.close()
-    conn.close()
-    messagebox.showinfo("Export Data", "Data exported to Excel successfully!")
+def table_file_path(file_path, table, extension):
+    # CSV and Parquet hold one table per file: <name>_<table><extension>.
+    base = file_path[:-len(extension)] if file_path.endswith(extension) else file_path
+    return f"{base}_{table}{extension}"
 
 
-def get_column_names(conn, table_name):
-    cursor = conn.cursor()
-    cursor.execute(f'PRAGMA table_info({table_name})')
-    columns = cursor.fetchall()
-    return [column[1] for column in columns]
+def write_files(paths, write):
+    try:
+        write()
+    except BaseException:
+        for path in paths:
+            if os.path.exists(path):
+                os.remove(path)
+        raise
+
+
+def sheet_name(table, part):
+    # Sheet names are limited to 31 characters; later parts are <table>_2, _3...
+    suffix = f"_{part}" if part > 1 else ''
+    return table[:31 - len(suffix)] + suffix
+
+
+def write_sheet_row(sheet, table, row_index, row):
+    # xlsxwriter signals problems (a row past the limit, a string too long for
+    # a cell) with a return code and drops the rest of the row.
+    error = sheet.write_row(row_index, 0, row)
+    if error:
+        raise ValueError(f"Could not write a row of {table} to Excel (xlsxwriter error {error}). "
+                         "Export to CSV or Parquet instead.")
+
+
+def write_workbook(file_path, sheets):
+    """Write (table, chunks) pairs, chunks as yielded by read_table, one sheet per table.
+
+    A table longer than an Excel sheet continues on <table>_2, <table>_3, ...
+    each starting with the column names again.
+    """
+    def write():
+        workbook = xlsxwriter.Workbook(file_path, {'constant_memory': True})
+        try:
+            for table, chunks in sheets:
+                # constant_memory flushes each row once the next one starts, so
+                # rows must be written strictly top to bottom.
+                header = next(chunks)
+                part = 1
+                sheet = workbook.add_worksheet(sheet_name(table, part))
+                write_sheet_row(sheet, table, 0, header)
+                row_index = 1
+                for rows in chunks:
+                    for row in rows:
+                        if row_index >= EXCEL_MAX_ROWS:
+                            part += 1
+                            sheet = workbook.add_worksheet(sheet_name(table, part))
+                            write_sheet_row(sheet, table, 0, header)
+                            row_index = 1
+                        write_sheet_row(sheet, table, row_index, row)
+                        row_index += 1
+        finally:
+            workbook.close()
+
+    write_files([file_path], write)
+    return [file_path]
+
+
+def export_data_to_excel(tables, start_date, end_date, file_path, progress=None):
+    progress = progress or ExportProgress()
+    progress.total = count_rows(tables, start_date, end_date)
+    return write_workbook(file_path, ((table, read_table(table, start_date, end_date, progress)) for table in tables))
+
+
+def export_data_to_csv(tables, start_date, end_date, file_path, progress=None):
+    progress = progress or ExportProgress()
+    progress.total = count_rows(tables, start_date, end_date)
+    paths = [table_file_path(file_path, table, '.csv.gz') for table in tables]
+
+    def write():
+        for table, path in zip(tables, paths):
+            with gzip.open(path, 'wt', newline='', encoding='utf-8') as output:
+                chunks = read_table(table, start_date, end_date, progress)
+                writer = csv.writer(output)
+                writer.writerow(next(chunks))
+                for rows in chunks:
+                    writer.writerows(rows)
+
+    write_files(paths, write)
+    return paths
+
+
+# SQLite declared types -> Arrow types; anything else is written as text.
+ARROW_TYPES = {'INTEGER': 'int64', 'REAL': 'float64', 'DATE': 'string', 'TEXT': 'string'}
+
+
+def arrow_schema(table, columns):
+    declared = {row[1]: row[2].upper() for row in data_access.get_connection().execute(f'PRAGMA table_info({table})')}
+    return pa.schema([(column, getattr(pa, ARROW_TYPES.get(declared.get(column), 'string'))())
+                      for column in columns])
+
+
+def export_data_to_parquet(tables, start_date, end_date, file_path, progress=None):
+    if pq is None:
+        raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow).")
+    progress = progress or ExportProgress()
+    progress.total = count_rows(tables, start_date, end_date)
+    paths = [table_file_path(file_path, table, '.parquet') for table in tables]
+
+    def write():
+        for table, path in zip(tables, paths):
+            chunks = read_table(table, start_date, end_date, progress)
+            schema = arrow_schema(table, next(chunks))
+            with pq.ParquetWriter(path, schema, compression='zstd') as writer:
+                for rows in chunks:
+                    # One row group per chunk, built column by column.
+                    arrays = [pa.array(values, type=field.type) for values, field in zip(zip(*rows), schema)]
+                    writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+
+    write_files(paths, write)
+    return paths
+
+
+# label -> (extension, file dialog filter, export function)
+EXPORT_FORMATS = {
+    'Excel (.xlsx)': ('.xlsx', ("Excel files", "*.xlsx"), export_data_to_excel),
+    'CSV (.csv.gz)': ('.csv.gz', ("Gzip CSV files", "*.csv.gz"), export_data_to_csv),
+}
+if pq is not None:
+    EXPORT_FORMATS['Parquet (.parquet)'] = ('.parquet', ("Parquet files", "*.parquet"), export_data_to_parquet)
+
+
+# Parallel export: each table is read (and, for CSV/Parquet, written) by its
+# own process over a read-only connection. A workbook has a single writer, so
+# for Excel the processes only read and serialize their table into a pickled
+# part file and the sheets are then written from those parts, in order.
+EXPORT_PROCESSES = os.cpu_count() or 1
+
+_worker_progress = {}
+
+
+class SharedProgress:
+    """ExportProgress counterpart updated from the export processes."""
+
+    def __init__(self, done, cancelled):
+        self._done = done
+        self._cancelled = cancelled
+        self.total = 0
+
+    def add(self, rows):
+        with self._done.get_lock():
+            self._done.value += rows
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+
+def init_export_process(database_path, done, cancelled):
+    data_access.DATABASE_PATH = database_path
+    data_access.READ_ONLY = True
+    data_access.use_profile('reporting')
+    _worker_progress['progress'] = SharedProgress(done, cancelled)
+
+
+def export_table_in_process(export, table, start_date, end_date, file_path):
+    return export([table], start_date, end_date, file_path, _worker_progress['progress'])
+
+
+def dump_table_part(table, start_date, end_date, part_path):
+    progress = _worker_progress['progress']
+    with open(part_path, 'wb') as part:
+        for chunk in read_table(table, start_date, end_date, progress):
+            pickle.dump(chunk, part, pickle.HIGHEST_PROTOCOL)
+    return part_path
+
+
+def read_table_part(part_path, progress):
+    with open(part_path, 'rb') as part:
+        yield pickle.load(part)
+        while True:
+            try:
+                rows = pickle.load(part)
+            except EOFError:
+                return
+            yield rows
+            progress.add(len(rows))
+            if progress.cancelled:
+                raise ExportCancelled()
+
+
+def export_in_parallel(export, tables, start_date, end_date, file_path, progress=None, processes=EXPORT_PROCESSES):
+    """Run `export` (one of the EXPORT_FORMATS functions) with one process per table."""
+    progress = progress or ExportProgress()
+    progress.total = count_rows(tables, start_date, end_date)
+    excel = export is export_data_to_excel
+    if excel:
+        # Reading in the processes and writing the sheets both count.
+        progress.total *= 2
+        part_dir = tempfile.mkdtemp(prefix='allegro_export_')
+    # spawn: the parent has Tk and the database thread running, which fork
+    # would copy half-way through.
+    context = multiprocessing.get_context('spawn')
+    done = context.Value('q', 0)
+    cancelled = context.Event()
+    pool = ProcessPoolExecutor(max_workers=max(1, min(processes, len(tables))), mp_context=context,
+                               initializer=init_export_process,
+                               initargs=(os.path.abspath(data_access.DATABASE_PATH), done, cancelled))
+    try:
+        with pool:
+            if excel:
+                futures = [pool.submit(dump_table_part, table, start_date, end_date,
+                                       os.path.join(part_dir, f'{index}.part'))
+                           for index, table in enumerate(tables)]
+            else:
+                futures = [pool.submit(export_table_in_process, export, table, start_date, end_date, file_path)
+                           for table in tables]
+            pending = set(futures)
+            while pending:
+                finished, pending = wait(pending, timeout=0.1)
+                progress.done = done.value
+                if progress.cancelled or any(future.exception() for future in finished):
+                    cancelled.set()
+            results = [future.result() for future in futures]
+
+        if excel:
+            progress.done = done.value
+            return write_workbook(file_path, ((table, read_table_part(part, progress))
+                                              for table, part in zip(tables, results)))
+        return [path for paths in results for path in paths]
+    except BaseException:
+        if not excel:
+            # Tables that did finish are removed too: the export is all or nothing.
+            extension = next(ext for ext, _, function in EXPORT_FORMATS.values() if function is export)
+            for table in tables:
+                path = table_file_path(file_path, table, extension)
+                if os.path.exists(path):
+                    os.remove(path)
+        raise
+    finally:
+        if excel:
+            shutil.rmtree(part_dir, ignore_errors=True)
+
+
+def track_progress(progressbar, progress, job):
+    if job.finished:
+        progressbar['value'] = 0
+        return
+    progressbar['maximum'] = max(progress.total, 1)
+    progressbar['value'] = progress.done
+    progressbar.after(100, track_progress, progressbar, progress, job)
 
 
-def get_database_schema(db_path):
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-    tables = cursor.fetchall()
-    conn.close()
-    return [table[0] for table in tables]
+def get_database_schema():
+    return data_access.list_tables()
 
 
-def select_file():
-    file_path = filedialog.asksaveasfilename(defaultextension=".xlsx", filetypes=[("Excel files", "*.xlsx")])
+def select_file(window, progressbar, cancel_button):
+    extension, file_type, export = EXPORT_FORMATS[format_var.get()]
+    file_path = filedialog.asksaveasfilename(defaultextension=extension, filetypes=[file_type])
     if not file_path:
         return
 
-    db_path = 'food_supplier.db'
     selected_tables = [table for table in table_vars if table_vars[table].get()]
     start_date = start_date_var.get()
     end_date = end_date_var.get()
@@ -74,26 +375,50 @@ def select_file():
         messagebox.showerror("No Selection", "Please select at least one table to export.")
         return
 
-    export_data_to_excel(db_path, selected_tables, start_date, end_date, file_path)
+    def finished(result):
+        cancel_button.config(state=tk.DISABLED)
+        messagebox.showinfo("Export Data", "Data exported successfully to:\n" + "\n".join(result))
+
+    def failed(error):
+        cancel_button.config(state=tk.DISABLED)
+        messagebox.showerror("Export Data", f"Export failed: {error}")
+
+    def cancel():
+        progress.cancelled = True
+        job.cancel()
+        cancel_button.config(state=tk.DISABLED)
+        progressbar['value'] = 0
+        messagebox.showinfo("Export Data", "Export cancelled.")
+
+    progress = ExportProgress()
+    if parallel_var.get() and len(selected_tables) > 1:
+        job = db_worker.submit(window, export_in_parallel, export, selected_tables, start_date, end_date, file_path,
+                               progress, on_done=finished, on_error=failed, profile='reporting')
+    else:
+        job = db_worker.submit(window, export, selected_tables, start_date, end_date, file_path, progress,
+                               on_done=finished, on_error=failed, profile='reporting')
+    cancel_button.config(command=cancel, state=tk.NORMAL)
+    track_progress(progressbar, progress, job)
 
 
 def show_export_window():
     export_window = tk.Toplevel()
-    export_window.title("Export Data to Excel")
+    export_window.title("Export Data")
     export_window.geometry("400x500")
+    db_worker.watch_busy(export_window)
     apply_styles(export_window)
 
     main_frame = ttk.Frame(export_window, padding="20 20 20 20")
     main_frame.pack(fill=tk.BOTH, expand=True)
 
-    header_label = ttk.Label(main_frame, text="Export Data to Excel", style="Header.TLabel")
+    header_label = ttk.Label(main_frame, text="Export Data", style="Header.TLabel")
     header_label.pack(pady=(0, 20))
 
     ttk.Label(main_frame, text="Select Tables to Export:", style="TLabel").pack(anchor='w', pady=(0, 5))
 
     global table_vars
     table_vars = {}
-    tables = get_database_schema('food_supplier.db')
+    tables = get_database_schema()
 
     tables_frame = ttk.Frame(main_frame)
     tables_frame.pack(fill=tk.BOTH, expand=True, pady=(0, 10))
@@ -121,9 +446,27 @@ def show_export_window():
     end_date_entry.grid(row=1, column=1, sticky='w', pady=(10, 0))
     end_date_entry.insert(0, 'YYYY-MM-DD')  # Placeholder text
 
-    export_button = ttk.Button(main_frame, text="Export", command=select_file, style="TButton")
+    format_frame = ttk.Frame(main_frame)
+    format_frame.pack(fill=tk.X, pady=(10, 0))
+    ttk.Label(format_frame, text="Format:", style="TLabel").pack(side=tk.LEFT, padx=(0, 10))
+    global format_var
+    format_var = tk.StringVar(value=next(iter(EXPORT_FORMATS)))
+    ttk.Combobox(format_frame, textvariable=format_var, values=list(EXPORT_FORMATS), state='readonly').pack(side=tk.LEFT)
+    global parallel_var
+    parallel_var = tk.BooleanVar(value=False)
+    ttk.Checkbutton(format_frame, text="One process per table", variable=parallel_var,
+                    style="TCheckbutton").pack(side=tk.LEFT, padx=(10, 0))
+
+    export_button = ttk.Button(main_frame, text="Export", style="TButton",
+                               command=lambda: select_file(export_window, progressbar, cancel_button))
     export_button.pack(pady=(20, 0))
 
+    progressbar = ttk.Progressbar(main_frame, mode='determinate')
+    progressbar.pack(fill=tk.X, pady=(10, 0))
+
+    cancel_button = ttk.Button(main_frame, text="Cancel", state=tk.DISABLED, style="TButton")
+    cancel_button.pack(pady=(10, 0))
+
     apply_color_palette(header_label, "header")
     apply_color_palette(tables_frame, "frame")
     apply_color_palette(date_frame, "frame")
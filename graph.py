@@ -1,17 +1,10 @@
-import matplotlib.pyplot as plt
-import sqlite3
+from collections import OrderedDict
 from datetime import datetime, timedelta
 import matplotlib.ticker as mticker
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from matplotlib.figure import Figure
 
-DATABASE_PATH = 'food_supplier.db'
-
-def connect_to_db():
-    try:
-        conn = sqlite3.connect(DATABASE_PATH)
-        return conn
-    except sqlite3.Error as e:
-        print(f"Erro ao conectar-se ao banco de dados: {e}")
-        return None
+import data_access
 
 def convert_date_format(date_str):
     try:
@@ -30,110 +23,157 @@ def get_all_months(start_date, end_date):
         current = current.replace(day=1)
     return months
 
+def get_month_range(start_date, end_date):
+    # The report covers whole months, from the start date's month through the
+    # end date's month.
+    return convert_date_format(start_date)[:7], convert_date_format(end_date)[:7]
+
 def get_expenses(start_date, end_date):
-    conn = connect_to_db()
-    if conn is None:
-        return []
-
-    cursor = conn.cursor()
-    query = '''
-    SELECT strftime('%Y-%m', substr(date, 7, 4) || '-' || substr(date, 4, 2) || '-' || substr(date, 1, 2)) as month, type, SUM(amount) 
-    FROM Despesas 
-    WHERE strftime('%Y-%m', substr(date, 7, 4) || '-' || substr(date, 4, 2) || '-' || substr(date, 1, 2)) BETWEEN ? AND ?
-    GROUP BY strftime('%Y-%m', substr(date, 7, 4) || '-' || substr(date, 4, 2) || '-' || substr(date, 1, 2)), type
-    '''
-    start_date_formatted = convert_date_format(start_date)
-    end_date_formatted = convert_date_format(end_date)
-    print(f"Executing query: \n{query}\nWith parameters: {start_date_formatted}, {end_date_formatted}")
-    cursor.execute(query, (start_date_formatted, end_date_formatted))
-    expenses = cursor.fetchall()
-    conn.close()
+    start_date_formatted, end_date_formatted = get_month_range(start_date, end_date)
+    print(f"Executing query: \n{data_access.SQL_MONTHLY_EXPENSES}\nWith parameters: {start_date_formatted}, {end_date_formatted}")
+    expenses = data_access.fetch_monthly_expenses(start_date_formatted, end_date_formatted)
     print(f"Expenses fetched: {expenses}")
     return expenses
 
 def fetch_data(start_date, end_date, client_filter=""):
-    conn = connect_to_db()
-    if conn is None:
-        return []
-
-    cursor = conn.cursor()
-    query = '''
-    SELECT strftime('%Y-%m', Compras.purchase_date) as month, SUM(Compras.total_amount)
-    FROM Compras 
-    WHERE date(Compras.purchase_date) BETWEEN date(?) AND date(?)
-    GROUP BY strftime('%Y-%m', Compras.purchase_date)
-    '''
-    start_date_formatted = convert_date_format(start_date)
-    end_date_formatted = convert_date_format(end_date)
-    params = [start_date_formatted, end_date_formatted]
-    print(f"Executing query: \n{query}\nWith parameters: {params}")
-    cursor.execute(query, params)
-    data = cursor.fetchall()
-    conn.close()
+    params = list(get_month_range(start_date, end_date))
+    print(f"Executing query: \n{data_access.SQL_MONTHLY_PURCHASES}\nWith parameters: {params}")
+    data = data_access.fetch_monthly_purchases(*params)
     print(f"Data fetched: {data}")
     return data
 
-def plot_monthly_purchases(start_date, end_date, plot_purchases, plot_investments, plot_materials, plot_total):
-    print(f"Plotting data from {start_date} to {end_date}")
-    expenses = get_expenses(start_date, end_date)
-    purchases = fetch_data(start_date, end_date)
-
-    # Extract unique months from expenses and purchases
+def load_monthly_data(start_date, end_date):
+    # Only the queries: safe to run on the database thread (see db_worker).
+    return get_expenses(start_date, end_date), fetch_data(start_date, end_date)
+
+# (key, legend label, color, marker) of each line, in drawing order.
+SERIES = [
+    ('purchases', 'Compras', 'green', None),
+    ('investments', 'Investimentos', 'orange', None),
+    ('materials', 'Gastos com Materiais', 'purple', None),
+    ('expenses', 'Total Despesas', 'red', None),
+    ('total', 'Total', 'yellow', 'o'),
+]
+# Rendered chart backgrounds kept per (months, y range, canvas size).
+BACKGROUND_CACHE_SIZE = 16
+MAX_MONTH_TICKS = 12
+
+
+def monthly_series(expenses, purchases):
+    """Months in the data and the amounts of every series, one value per month."""
     all_months = sorted(set([row[0] for row in expenses] + [row[0] for row in purchases]))
-    print(f"All months: {all_months}")
-
-    # Create dictionaries for purchases and expenses
-    purchase_dict = {month: 0 for month in all_months}
-    investment_expense_dict = {month: 0 for month in all_months}
-    material_expense_dict = {month: 0 for month in all_months}
+    index = {month: i for i, month in enumerate(all_months)}
+    series = {key: [0.0] * len(all_months) for key, _, _, _ in SERIES}
 
     for month, amount in purchases:
-        purchase_dict[month] = amount
-
+        series['purchases'][index[month]] = amount
     for month, type_, amount in expenses:
         if type_ == 'Investimentos':
-            investment_expense_dict[month] = amount
+            series['investments'][index[month]] = amount
         elif type_ == 'Materiais':
-            material_expense_dict[month] = amount
-
-    # Calculate total expenses and net values
-    total_expenses = {month: investment_expense_dict[month] + material_expense_dict[month] for month in all_months}
-    net_values = {month: purchase_dict[month] - total_expenses[month] for month in all_months}
-
-    # Plotting
-    fig, ax = plt.subplots(figsize=(10, 6))
-
-    if plot_purchases:
-        purchase_amounts = [purchase_dict[month] for month in all_months]
-        print(f"Purchase amounts: {purchase_amounts}")
-        ax.plot(all_months, purchase_amounts, color='green', label='Compras')
-
-    if plot_investments:
-        investment_amounts = [investment_expense_dict[month] for month in all_months]
-        print(f"Investment amounts: {investment_amounts}")
-        ax.plot(all_months, investment_amounts, color='orange', label='Investimentos')
-
-    if plot_materials:
-        material_amounts = [material_expense_dict[month] for month in all_months]
-        print(f"Material amounts: {material_amounts}")
-        ax.plot(all_months, material_amounts, color='purple', label='Gastos com Materiais')
-
-    if plot_investments and plot_materials:
-        total_expenses_amounts = [total_expenses[month] for month in all_months]
-        print(f"Total expenses: {total_expenses_amounts}")
-        ax.plot(all_months, total_expenses_amounts, color='red', label='Total Despesas')
-
-    if plot_total:
-        net_values_amounts = [net_values[month] for month in all_months]
-        print(f"Net values: {net_values_amounts}")
-        ax.plot(all_months, net_values_amounts, color='yellow', label='Total', marker='o')
-
-    ax.set_xlabel('Meses')
-    ax.set_ylabel('Receita')
-    ax.set_title('Compras Mensais e Despesas')
-    ax.legend()
-
-    # Format the y-axis as currency
-    ax.yaxis.set_major_formatter(mticker.FuncFormatter(lambda x, pos: f'R${x:,.2f}'))
-
-    plt.show()
+            series['materials'][index[month]] = amount
+
+    for i in range(len(all_months)):
+        series['expenses'][i] = series['investments'][i] + series['materials'][i]
+        series['total'][i] = series['purchases'][i] - series['expenses'][i]
+    return all_months, series
+
+
+def visible_series(plot_purchases, plot_investments, plot_materials, plot_total):
+    return {
+        'purchases': plot_purchases,
+        'investments': plot_investments,
+        'materials': plot_materials,
+        'expenses': plot_investments and plot_materials,
+        'total': plot_total,
+    }
+
+
+class MonthlyChart:
+    """The monthly purchases chart, embedded in a Tk window.
+
+    The figure, axes and one line per series are created once; plotting a
+    range only replaces the lines' data. Lines and legend are animated
+    artists, blitted over a background (axes, ticks, labels) that is
+    rendered once per range and kept in a small cache, so toggling a series
+    or going back to a range already shown skips the full redraw.
+    """
+
+    def __init__(self, master):
+        self.figure = Figure(figsize=(8, 4.5))
+        self.axes = self.figure.add_subplot()
+        self.axes.set_xlabel('Meses')
+        self.axes.set_ylabel('Receita')
+        self.axes.set_title('Compras Mensais e Despesas')
+        # Format the y-axis as currency
+        self.axes.yaxis.set_major_formatter(mticker.FuncFormatter(lambda x, pos: f'R${x:,.2f}'))
+        self.lines = {}
+        for key, label, color, marker in SERIES:
+            self.lines[key], = self.axes.plot([], [], color=color, label=label, marker=marker, animated=True)
+        self.legend = None
+        self.visible = dict.fromkeys(self.lines, True)
+        self.layout_key = None
+        self.backgrounds = OrderedDict()
+        self.canvas = FigureCanvasTkAgg(self.figure, master=master)
+        self.canvas.mpl_connect('draw_event', self.on_draw)
+        self.widget = self.canvas.get_tk_widget()
+
+    def plot(self, expenses, purchases, visible):
+        months, series = monthly_series(expenses, purchases)
+        positions = range(len(months))
+        for key, line in self.lines.items():
+            line.set_data(positions, series[key])
+        # The y range covers every series, shown or not, so toggling one
+        # keeps the background valid.
+        values = [value for amounts in series.values() for value in amounts]
+        low, high = min(values, default=0.0), max(values, default=0.0)
+        margin = (high - low) * 0.05 or 1.0
+        y_range = (min(low, 0.0) - margin, max(high, 0.0) + margin)
+        step = max(1, -(-len(months) // MAX_MONTH_TICKS))
+        self.axes.set_xticks(positions[::step], months[::step])
+        self.axes.set_xlim(-0.5, max(len(months), 1) - 0.5)
+        self.axes.set_ylim(*y_range)
+        self.layout_key = (tuple(months), y_range)
+        self.visible = dict(visible)
+        self.refresh()
+
+    def show_series(self, visible):
+        self.visible = dict(visible)
+        if self.layout_key is not None:
+            self.refresh()
+
+    def refresh(self):
+        background = self.backgrounds.get(self.cache_key())
+        if background is None:
+            self.canvas.draw()  # on_draw caches the new background
+            return
+        self.backgrounds.move_to_end(self.cache_key())
+        self.canvas.restore_region(background)
+        self.draw_series()
+        self.canvas.blit(self.figure.bbox)
+
+    def cache_key(self):
+        return self.layout_key, self.canvas.get_width_height()
+
+    def on_draw(self, event):
+        # Every full draw (a new range, a window resize) leaves the animated
+        # artists out: keep that background, then draw them on top.
+        self.backgrounds[self.cache_key()] = self.canvas.copy_from_bbox(self.figure.bbox)
+        self.backgrounds.move_to_end(self.cache_key())
+        while len(self.backgrounds) > BACKGROUND_CACHE_SIZE:
+            self.backgrounds.popitem(last=False)
+        self.draw_series()
+
+    def draw_series(self):
+        shown = [line for key, line in self.lines.items() if self.visible.get(key)]
+        for line in self.lines.values():
+            line.set_visible(line in shown)
+            if line in shown:
+                self.figure.draw_artist(line)
+        if self.legend is not None:
+            self.legend.remove()
+            self.legend = None
+        if shown:
+            self.legend = self.axes.legend(handles=shown)
+            self.legend.set_animated(True)
+            self.figure.draw_artist(self.legend)
@@ -1,21 +1,13 @@
-import sqlite3
 import tkinter as tk
 from tkinter import messagebox, ttk
 from PIL import Image, ImageTk
 import os
 import ui_config
-import tkinter.font as tkFont
 
-DATABASE_PATH = 'food_supplier.db'
-
-
-def connect_to_db():
-    try:
-        conn = sqlite3.connect(DATABASE_PATH)
-        return conn
-    except sqlite3.Error as e:
-        messagebox.showerror("Erro de Conexão", f"Erro ao conectar-se ao banco de dados: {e}")
-        return None
+import column_sizer
+import data_access
+import db_worker
+import tree_sync
 
 
 def add_or_update_ingredient(ingredient_name, price_per_unit, unit, quantity, tree, status_label):
@@ -29,31 +21,21 @@ def add_or_update_ingredient(ingredient_name, price_per_unit, unit, quantity, tr
         messagebox.showwarning("Erro de Entrada", "O preço e a quantidade devem ser números")
         return
 
-    conn = connect_to_db()
-    cursor = conn.cursor()
+    ingredient_id = data_access.find_ingredient_id(ingredient_name)
 
-    cursor.execute('''
-    SELECT ingredient_id FROM Ingredientes WHERE ingredient_name = ?
-    ''', (ingredient_name,))
-    ingredient = cursor.fetchone()
-
-    if ingredient:
-        cursor.execute('''
-        UPDATE Ingredientes
-        SET price_per_unit = ?, unit = ?, quantity = ?, is_active = 1
-        WHERE ingredient_id = ?
-        ''', (price_per_unit, unit, quantity, ingredient[0]))
+    recipes = 0
+    if ingredient_id is not None:
+        recipes = data_access.update_ingredient(ingredient_id, price_per_unit, unit, quantity)
         messagebox.showinfo("Sucesso", "Ingrediente atualizado com sucesso!")
     else:
-        cursor.execute('''
-        INSERT INTO Ingredientes (ingredient_name, price_per_unit, unit, quantity) VALUES (?, ?, ?, ?)
-        ''', (ingredient_name, price_per_unit, unit, quantity))
+        data_access.insert_ingredient(ingredient_name, price_per_unit, unit, quantity)
         messagebox.showinfo("Sucesso", "Ingrediente adicionado com sucesso!")
 
-    conn.commit()
-    conn.close()
     update_ingredient_list(tree)
-    status_label.config(text=f"Ingrediente '{ingredient_name}' adicionado/atualizado com sucesso.")
+    status = f"Ingrediente '{ingredient_name}' adicionado/atualizado com sucesso."
+    if recipes:
+        status += f" Custo de {recipes} receita(s) atualizado."
+    status_label.config(text=status)
 
 
 def delete_ingredient(ingredient_id, tree, status_label):
@@ -61,54 +43,35 @@ def delete_ingredient(ingredient_id, tree, status_label):
         messagebox.showwarning("Erro de Entrada", "Por favor, selecione um ingrediente para deletar")
         return
 
-    conn = connect_to_db()
-    cursor = conn.cursor()
-
-    cursor.execute('''
-    UPDATE Ingredientes
-    SET is_active = 0
-    WHERE ingredient_id = ?
-    ''', (ingredient_id,))
+    rowcount = data_access.deactivate_ingredient(ingredient_id)
 
-    print(f"Rows affected: {cursor.rowcount}")  # Debugging statement
-    conn.commit()
-    conn.close()
+    print(f"Rows affected: {rowcount}")  # Debugging statement
     update_ingredient_list(tree)
     status_label.config(text=f"Ingrediente '{ingredient_id}' deletado com sucesso.")
 
 
 def update_ingredient_list(tree):
-    for i in tree.get_children():
-        tree.delete(i)
-    conn = connect_to_db()
-    cursor = conn.cursor()
-    cursor.execute(
-        'SELECT ingredient_id, ingredient_name, price_per_unit, unit, quantity FROM Ingredientes WHERE is_active = 1')
-    ingredients = cursor.fetchall()
-    conn.close()
+    db_worker.submit(tree, data_access.fetch_active_ingredients, on_done=lambda ingredients: show_ingredients(tree, ingredients))
+
 
+def show_ingredients(tree, ingredients):
+    rows = []
     for ingredient in ingredients:
         ingredient_id, name, price, unit, quantity = ingredient
         price_per_unit = price / quantity if quantity > 0 else 0
-        tree.insert("", "end", iid=ingredient_id, values=(name, f"{price_per_unit:.2f}", unit, quantity))
+        rows.append((ingredient_id, (name, f"{price_per_unit:.2f}", unit, quantity)))
+    tree_sync.reconcile(tree, rows)
 
-    for col in tree["columns"]:
-        max_width = max(tkFont.Font().measure(tree.set(item, col)) for item in tree.get_children())
-        tree.column(col, width=max_width + 20, anchor='center')  # Center the text in columns
+    column_sizer.autosize_columns(tree, anchor='center')
     for col in tree["columns"]:
         tree.heading(col, anchor='center')  # Center the heading text
 
-    for col in tree["columns"]:
-        max_width = max(tkFont.Font().measure(tree.set(item, col)) for item in tree.get_children())
-        tree.column(col, width=max_width + 20)
-
-
-
 
 def open_add_ingredient_window(root):
     window = tk.Toplevel(root)
     window.title("Adicionar Ingrediente")
     window.geometry("600x500")
+    db_worker.watch_busy(window)
 
     # Apply styles to the window
     ui_config.apply_styles(window)
@@ -1,6 +1,7 @@
 import tkinter as tk
 from tkinter import ttk
 import os
+import migrations
 from analytics import open_analytics_menu
 from expenses import open_expenses_window
 from clients import open_add_client_window
@@ -10,6 +11,8 @@ from purchases import open_add_purchase_window
 from ui_config import apply_styles, load_icon
 
 def main():
+    migrations.run_migrations()
+
     root = tk.Tk()
     root.title("Recipe Manager")
     root.geometry("400x350")
@@ -0,0 +1,475 @@
+import sqlite3
+import sys
+from datetime import datetime
+
+import data_access
+
+_applied = False
+
+
+def create_base_tables(cursor):
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS Clientes (
+        client_id INTEGER PRIMARY KEY,
+        client_name TEXT NOT NULL,
+        birthday TEXT NOT NULL,
+        address TEXT NOT NULL
+    )
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS Ingredientes (
+        ingredient_id INTEGER PRIMARY KEY,
+        ingredient_name TEXT NOT NULL UNIQUE,
+        price_per_unit REAL NOT NULL,
+        unit TEXT NOT NULL,
+        quantity REAL NOT NULL DEFAULT 0.0,
+        is_active INTEGER NOT NULL DEFAULT 1
+    )
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS Receitas (
+        recipe_id INTEGER PRIMARY KEY,
+        recipe_name TEXT NOT NULL,
+        total_price REAL NOT NULL,
+        selling_price REAL NOT NULL,
+        mao_de_obra REAL DEFAULT 0,
+        gas_agua_luz REAL DEFAULT 0,
+        porcoes INTEGER DEFAULT 1
+    )
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS Recipe_Ingredients (
+        id INTEGER PRIMARY KEY,
+        recipe_id INTEGER NOT NULL,
+        ingredient_id INTEGER NOT NULL,
+        quantity REAL NOT NULL,
+        FOREIGN KEY (recipe_id) REFERENCES Receitas(recipe_id),
+        FOREIGN KEY (ingredient_id) REFERENCES Ingredientes(ingredient_id)
+    )
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS Compras (
+        purchase_id INTEGER PRIMARY KEY,
+        client_id INTEGER NOT NULL,
+        purchase_date TEXT NOT NULL,
+        total_amount REAL NOT NULL,
+        FOREIGN KEY (client_id) REFERENCES Clientes(client_id)
+    )
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS Purchase_Items (
+        id INTEGER PRIMARY KEY,
+        purchase_id INTEGER NOT NULL,
+        recipe_id INTEGER NOT NULL,
+        quantity REAL NOT NULL,
+        FOREIGN KEY (purchase_id) REFERENCES Compras(purchase_id),
+        FOREIGN KEY (recipe_id) REFERENCES Receitas(recipe_id)
+    )
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS Despesas (
+        expense_id INTEGER PRIMARY KEY,
+        description TEXT NOT NULL,
+        date TEXT NOT NULL,
+        amount REAL NOT NULL,
+        type TEXT NOT NULL
+    )
+    ''')
+
+
+def create_lookup_indexes(cursor):
+    # Compras: per-client totals (top customers) and date ranges (monthly
+    # report, top customers of the month). Both indexes carry total_amount so
+    # the aggregations never touch the table.
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_compras_client_date
+    ON Compras (client_id, purchase_date, total_amount)
+    ''')
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_compras_date
+    ON Compras (purchase_date, client_id, total_amount)
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_purchase_items_purchase ON Purchase_Items (purchase_id)')
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_recipe_ingredients_recipe
+    ON Recipe_Ingredients (recipe_id, ingredient_id, quantity)
+    ''')
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_recipe_ingredients_ingredient
+    ON Recipe_Ingredients (ingredient_id, recipe_id)
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_clientes_name ON Clientes (client_name)')
+    cursor.execute('ANALYZE')
+
+
+def convert_expense_dates_to_iso(cursor):
+    cursor.execute('''
+    UPDATE Despesas
+    SET date = substr(date, 7, 4) || '-' || substr(date, 4, 2) || '-' || substr(date, 1, 2)
+    WHERE date GLOB '[0-9][0-9]/[0-9][0-9]/[0-9][0-9][0-9][0-9]'
+    ''')
+    cursor.execute('ANALYZE Despesas')
+
+
+def add_missing_columns(cursor):
+    # Databases created by older versions of the windows (or by database.py)
+    # may predate these columns. This is the only place that still probes the
+    # schema, and it runs once per database.
+    def columns(table):
+        cursor.execute(f'PRAGMA table_info({table})')
+        return [column[1] for column in cursor.fetchall()]
+
+    recipe_columns = columns('Receitas')
+    if 'mao_de_obra' not in recipe_columns:
+        cursor.execute('ALTER TABLE Receitas ADD COLUMN mao_de_obra REAL DEFAULT 0')
+    if 'gas_agua_luz' not in recipe_columns:
+        cursor.execute('ALTER TABLE Receitas ADD COLUMN gas_agua_luz REAL DEFAULT 0')
+    if 'porcoes' not in recipe_columns:
+        cursor.execute('ALTER TABLE Receitas ADD COLUMN porcoes INTEGER DEFAULT 1')
+
+    ingredient_columns = columns('Ingredientes')
+    if 'quantity' not in ingredient_columns:
+        cursor.execute('ALTER TABLE Ingredientes ADD COLUMN quantity REAL NOT NULL DEFAULT 0.0')
+    if 'is_active' not in ingredient_columns:
+        cursor.execute('ALTER TABLE Ingredientes ADD COLUMN is_active INTEGER NOT NULL DEFAULT 1')
+
+    expense_columns = columns('Despesas')
+    if 'type' not in expense_columns:
+        cursor.execute("ALTER TABLE Despesas ADD COLUMN type TEXT NOT NULL DEFAULT ''")
+        if 'expense_type' in expense_columns:
+            cursor.execute('UPDATE Despesas SET type = expense_type')
+    # Built here rather than with the other lookup indexes: tables created by
+    # database.py only get the type column above.
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_despesas_date ON Despesas (date, type, amount)')
+    cursor.execute('ANALYZE Despesas')
+
+
+def rebuild_monthly_summary(cursor):
+    cursor.execute('DELETE FROM Monthly_Summary')
+    cursor.execute('''
+    INSERT INTO Monthly_Summary (source, month, category, amount, entries)
+    SELECT 'Compras', substr(purchase_date, 1, 7), '', SUM(total_amount), COUNT(*)
+    FROM Compras
+    GROUP BY substr(purchase_date, 1, 7)
+    ''')
+    cursor.execute('''
+    INSERT INTO Monthly_Summary (source, month, category, amount, entries)
+    SELECT 'Despesas', substr(date, 1, 7), type, SUM(amount), COUNT(*)
+    FROM Despesas
+    GROUP BY substr(date, 1, 7), type
+    ''')
+
+
+def create_monthly_summary(cursor):
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS Monthly_Summary (
+        source TEXT NOT NULL,
+        month TEXT NOT NULL,
+        category TEXT NOT NULL,
+        amount REAL NOT NULL DEFAULT 0,
+        entries INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (source, month, category)
+    ) WITHOUT ROWID
+    ''')
+    # Every write to Compras or Despesas moves its amount in or out of the
+    # matching month row, so the chart reads at most one row per month and
+    # category. Rows whose last entry was removed are dropped.
+    for table, month, category, amount in (
+            ('Compras', 'substr({row}.purchase_date, 1, 7)', "''", '{row}.total_amount'),
+            ('Despesas', 'substr({row}.date, 1, 7)', '{row}.type', '{row}.amount')):
+        add = f'''
+        INSERT INTO Monthly_Summary (source, month, category, amount, entries)
+        VALUES ('{table}', {month}, {category}, {amount}, 1)
+        ON CONFLICT (source, month, category)
+        DO UPDATE SET amount = amount + excluded.amount, entries = entries + 1;
+        '''.format(row='NEW')
+        remove = f'''
+        UPDATE Monthly_Summary SET amount = amount - {amount}, entries = entries - 1
+        WHERE source = '{table}' AND month = {month} AND category = {category};
+        DELETE FROM Monthly_Summary
+        WHERE source = '{table}' AND month = {month} AND category = {category} AND entries <= 0;
+        '''.format(row='OLD')
+        cursor.execute(f'CREATE TRIGGER IF NOT EXISTS trg_{table.lower()}_summary_insert '
+                       f'AFTER INSERT ON {table} BEGIN {add} END')
+        cursor.execute(f'CREATE TRIGGER IF NOT EXISTS trg_{table.lower()}_summary_delete '
+                       f'AFTER DELETE ON {table} BEGIN {remove} END')
+        cursor.execute(f'CREATE TRIGGER IF NOT EXISTS trg_{table.lower()}_summary_update '
+                       f'AFTER UPDATE ON {table} BEGIN {remove} {add} END')
+    rebuild_monthly_summary(cursor)
+
+
+def rebuild_client_counters(cursor, month=None):
+    month = month or datetime.now().strftime('%Y-%m')
+    start, end = data_access.month_bounds(month)
+    cursor.execute('''
+    UPDATE Clientes
+    SET purchases = (SELECT COUNT(*) FROM Compras WHERE Compras.client_id = Clientes.client_id),
+        total_amount_spent = COALESCE((SELECT SUM(total_amount) FROM Compras
+                                       WHERE Compras.client_id = Clientes.client_id), 0),
+        amount_spent_month = COALESCE((SELECT SUM(total_amount) FROM Compras
+                                       WHERE Compras.client_id = Clientes.client_id
+                                       AND purchase_date >= ? AND purchase_date < ?), 0),
+        spent_month = ?
+    ''', (start, end, month))
+
+
+def create_client_counters(cursor):
+    cursor.execute('ALTER TABLE Clientes ADD COLUMN purchases INTEGER NOT NULL DEFAULT 0')
+    cursor.execute('ALTER TABLE Clientes ADD COLUMN amount_spent_month REAL NOT NULL DEFAULT 0.0')
+    cursor.execute('ALTER TABLE Clientes ADD COLUMN total_amount_spent REAL NOT NULL DEFAULT 0.0')
+    cursor.execute('ALTER TABLE Clientes ADD COLUMN spent_month TEXT')
+    add = '''
+    UPDATE Clientes
+    SET purchases = purchases + 1,
+        total_amount_spent = total_amount_spent + NEW.total_amount,
+        amount_spent_month = amount_spent_month
+            + CASE WHEN substr(NEW.purchase_date, 1, 7) = spent_month THEN NEW.total_amount ELSE 0 END
+    WHERE client_id = NEW.client_id;
+    '''
+    remove = '''
+    UPDATE Clientes
+    SET purchases = purchases - 1,
+        total_amount_spent = total_amount_spent - OLD.total_amount,
+        amount_spent_month = amount_spent_month
+            - CASE WHEN substr(OLD.purchase_date, 1, 7) = spent_month THEN OLD.total_amount ELSE 0 END
+    WHERE client_id = OLD.client_id;
+    '''
+    cursor.execute(f'CREATE TRIGGER IF NOT EXISTS trg_compras_client_insert AFTER INSERT ON Compras BEGIN {add} END')
+    cursor.execute(f'CREATE TRIGGER IF NOT EXISTS trg_compras_client_delete AFTER DELETE ON Compras BEGIN {remove} END')
+    cursor.execute('CREATE TRIGGER IF NOT EXISTS trg_compras_client_update '
+                   f'AFTER UPDATE OF client_id, purchase_date, total_amount ON Compras BEGIN {remove} {add} END')
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_clientes_total_spent
+    ON Clientes (total_amount_spent, client_name, purchases)
+    ''')
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_clientes_month_spent
+    ON Clientes (spent_month, amount_spent_month, client_name)
+    ''')
+    rebuild_client_counters(cursor)
+
+
+# Receitas.total_price is the cost of its ingredients, priced as the recipe
+# form does: sum(price_per_unit * quantity). A recipe without ingredient rows
+# keeps the cost it was entered with.
+RECIPE_COST_UPDATE = '''
+UPDATE Receitas
+SET total_price = COALESCE((SELECT SUM(i.price_per_unit * ri.quantity)
+                            FROM Recipe_Ingredients ri
+                            JOIN Ingredientes i ON i.ingredient_id = ri.ingredient_id
+                            WHERE ri.recipe_id = Receitas.recipe_id), total_price)
+WHERE {recipes};
+'''
+
+
+def rebuild_recipe_costs(cursor):
+    cursor.execute(RECIPE_COST_UPDATE.format(recipes='1'))
+
+
+def create_recipe_cost_triggers(cursor):
+    # A new price reprices just the recipes that use the ingredient, found on
+    # idx_recipe_ingredients_ingredient, in a single UPDATE. Stored costs are
+    # not rebuilt here: run "python migrations.py rebuild-costs" once to
+    # replace the costs typed in before ingredients were tracked.
+    repriced = RECIPE_COST_UPDATE.format(
+        recipes='recipe_id IN (SELECT recipe_id FROM Recipe_Ingredients WHERE ingredient_id = NEW.ingredient_id)')
+    cursor.execute('CREATE TRIGGER IF NOT EXISTS trg_ingredientes_cost_update '
+                   'AFTER UPDATE OF price_per_unit ON Ingredientes '
+                   f'WHEN NEW.price_per_unit IS NOT OLD.price_per_unit BEGIN {repriced} END')
+    added = RECIPE_COST_UPDATE.format(recipes='recipe_id = NEW.recipe_id')
+    removed = RECIPE_COST_UPDATE.format(recipes='recipe_id = OLD.recipe_id')
+    changed = RECIPE_COST_UPDATE.format(recipes='recipe_id IN (OLD.recipe_id, NEW.recipe_id)')
+    cursor.execute(f'CREATE TRIGGER IF NOT EXISTS trg_recipe_ingredients_cost_insert '
+                   f'AFTER INSERT ON Recipe_Ingredients BEGIN {added} END')
+    cursor.execute(f'CREATE TRIGGER IF NOT EXISTS trg_recipe_ingredients_cost_delete '
+                   f'AFTER DELETE ON Recipe_Ingredients BEGIN {removed} END')
+    cursor.execute('CREATE TRIGGER IF NOT EXISTS trg_recipe_ingredients_cost_update '
+                   'AFTER UPDATE OF recipe_id, ingredient_id, quantity ON Recipe_Ingredients '
+                   f'BEGIN {changed} END')
+
+
+BIRTHDAY_MONTH_DAY = '''
+CASE
+    WHEN {row}.birthday GLOB '[0-9][0-9]/[0-9][0-9]/*' THEN substr({row}.birthday, 4, 2) || '-' || substr({row}.birthday, 1, 2)
+    WHEN {row}.birthday GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]*' THEN substr({row}.birthday, 6, 5)
+END
+'''
+
+
+def create_birthday_index(cursor):
+    cursor.execute('ALTER TABLE Clientes ADD COLUMN birthday_md TEXT')
+    cursor.execute(f"UPDATE Clientes SET birthday_md = {BIRTHDAY_MONTH_DAY.format(row='Clientes')}")
+    set_month_day = f'''
+    UPDATE Clientes SET birthday_md = {BIRTHDAY_MONTH_DAY.format(row='NEW')}
+    WHERE client_id = NEW.client_id;
+    '''
+    cursor.execute('CREATE TRIGGER IF NOT EXISTS trg_clientes_birthday_insert '
+                   f'AFTER INSERT ON Clientes BEGIN {set_month_day} END')
+    cursor.execute('CREATE TRIGGER IF NOT EXISTS trg_clientes_birthday_update '
+                   f'AFTER UPDATE OF birthday ON Clientes BEGIN {set_month_day} END')
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_clientes_birthday_md
+    ON Clientes (birthday_md, client_name, birthday)
+    ''')
+
+
+# Full-text indexes over the searchable text columns. remove_diacritics folds
+# accents ("Pão" matches "pao") and the 2/3-character prefix indexes make
+# "term*" queries cheap while the user types.
+FULL_TEXT_TABLES = [
+    ('Clientes', 'client_id', ('client_name', 'address')),
+    ('Despesas', 'expense_id', ('description', 'type')),
+    ('Receitas', 'recipe_id', ('recipe_name',)),
+]
+
+
+def create_full_text_search(cursor):
+    for table, key, columns in FULL_TEXT_TABLES:
+        fts_table = f'{table}_fts'
+        column_list = ', '.join(columns)
+        try:
+            cursor.execute(f'''
+            CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table} USING fts5(
+                {column_list}, content='{table}', content_rowid='{key}',
+                tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+            )
+            ''')
+        except sqlite3.OperationalError:
+            # SQLite built without FTS5: searches fall back to LIKE.
+            return
+        new_values = ', '.join(f'NEW.{column}' for column in columns)
+        old_values = ', '.join(f'OLD.{column}' for column in columns)
+        add = f'INSERT INTO {fts_table} (rowid, {column_list}) VALUES (NEW.{key}, {new_values});'
+        remove = (f"INSERT INTO {fts_table} ({fts_table}, rowid, {column_list}) "
+                  f"VALUES ('delete', OLD.{key}, {old_values});")
+        cursor.execute(f'CREATE TRIGGER IF NOT EXISTS trg_{table.lower()}_fts_insert '
+                       f'AFTER INSERT ON {table} BEGIN {add} END')
+        cursor.execute(f'CREATE TRIGGER IF NOT EXISTS trg_{table.lower()}_fts_delete '
+                       f'AFTER DELETE ON {table} BEGIN {remove} END')
+        cursor.execute(f'CREATE TRIGGER IF NOT EXISTS trg_{table.lower()}_fts_update '
+                       f'AFTER UPDATE OF {column_list} ON {table} BEGIN {remove} {add} END')
+        cursor.execute(f"INSERT INTO {fts_table} ({fts_table}) VALUES ('rebuild')")
+
+
+def create_expense_page_index(cursor):
+    # Pages of the expense list are walked by (date, expense_id). The rowid is
+    # the implicit last column of every index, so this one is in that order;
+    # idx_despesas_date has type and amount in between and needs a sort.
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_despesas_date_id ON Despesas (date)')
+    cursor.execute('ANALYZE Despesas')
+
+
+def add_purchase_external_id(cursor):
+    # Ids of purchases imported from other systems. They never become the local
+    # purchase_id; the unique index lets a re-import update the same rows. NULLs
+    # (purchases entered here) don't conflict.
+    cursor.execute('ALTER TABLE Compras ADD COLUMN external_id TEXT')
+    cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_compras_external_id ON Compras (external_id)')
+    cursor.execute('ANALYZE Compras')
+
+
+def create_new_client_month_trigger(cursor):
+    # Every client's counters point at the same month (see
+    # data_access.roll_over_client_counters). A client added later joins it;
+    # with spent_month NULL their purchases would never count for the month.
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_clientes_spent_month_insert AFTER INSERT ON Clientes
+    WHEN NEW.spent_month IS NULL BEGIN
+        UPDATE Clientes
+        SET spent_month = COALESCE((SELECT spent_month FROM Clientes WHERE spent_month IS NOT NULL LIMIT 1),
+                                   strftime('%Y-%m', 'now', 'localtime'))
+        WHERE client_id = NEW.client_id;
+    END
+    ''')
+    rebuild_client_counters(cursor)
+
+
+# Each step runs once per database, in order. Never edit a step that has
+# already shipped: add a new one instead.
+MIGRATIONS = [
+    (1, 'Tabelas base', create_base_tables),
+    (2, 'Índices para consultas e junções', create_lookup_indexes),
+    (3, 'Datas de Despesas em ISO (AAAA-MM-DD)', convert_expense_dates_to_iso),
+    (4, 'Colunas ausentes em bancos antigos', add_missing_columns),
+    (5, 'Resumo mensal de compras e despesas', create_monthly_summary),
+    (6, 'Contadores de gastos por cliente', create_client_counters),
+    (7, 'Índice de aniversários por mês e dia', create_birthday_index),
+    (8, 'Busca textual (FTS5) em clientes, despesas e receitas', create_full_text_search),
+    (9, 'Índice para paginar a lista de despesas', create_expense_page_index),
+    (10, 'Custo das receitas recalculado quando um ingrediente muda', create_recipe_cost_triggers),
+    (11, 'Id de origem das compras importadas', add_purchase_external_id),
+    (12, 'Mês dos contadores para clientes novos', create_new_client_month_trigger),
+]
+
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(conn):
+    try:
+        row = conn.execute('SELECT MAX(version) FROM schema_version').fetchone()
+    except sqlite3.OperationalError:
+        return 0
+    return row[0] or 0
+
+
+def run_migrations():
+    """Bring the database up to LATEST_VERSION; called once at startup."""
+    global _applied
+    if _applied:
+        return LATEST_VERSION
+    conn = data_access.get_connection()
+    version = current_version(conn)
+    pending = [migration for migration in MIGRATIONS if migration[0] > version]
+    if pending:
+        # All pending steps share one transaction: either the database ends up
+        # at the latest version or it is left exactly as it was.
+        cursor = conn.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                description TEXT NOT NULL,
+                applied_at TEXT NOT NULL
+            )
+            ''')
+            applied_at = datetime.now().isoformat(timespec='seconds')
+            for step_version, description, step in pending:
+                step(cursor)
+                cursor.execute('INSERT INTO schema_version (version, description, applied_at) VALUES (?, ?, ?)',
+                               (step_version, description, applied_at))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    _applied = True
+    return LATEST_VERSION
+
+
+def rebuild_summaries():
+    conn = data_access.get_connection()
+    with conn:
+        rebuild_monthly_summary(conn.cursor())
+        rebuild_client_counters(conn.cursor())
+
+
+def rebuild_costs():
+    conn = data_access.get_connection()
+    with conn:
+        rebuild_recipe_costs(conn.cursor())
+
+
+# python migrations.py                  aplica as migrações pendentes
+# python migrations.py rebuild-summary  recalcula Monthly_Summary e os
+#                                       contadores de Clientes do zero
+# python migrations.py rebuild-costs    recalcula o custo de todas as receitas
+#                                       a partir dos preços dos ingredientes
+if __name__ == "__main__":
+    print(f"Versão do esquema: {run_migrations()}")
+    if 'rebuild-summary' in sys.argv[1:]:
+        rebuild_summaries()
+        print("Resumo mensal e contadores de clientes recalculados.")
+    if 'rebuild-costs' in sys.argv[1:]:
+        rebuild_costs()
+        print("Custo das receitas recalculado.")
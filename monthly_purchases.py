@@ -1,18 +1,24 @@
 import tkinter as tk
 from tkinter import ttk
 from datetime import datetime
+import db_worker
 import graph
 
 def show_monthly_purchases():
+    def visible():
+        return graph.visible_series(purchases_var.get(), investments_var.get(), materials_var.get(), total_var.get())
+
     def plot_data():
         start_date_str = start_year_var.get() + '-' + start_month_var.get() + '-01'
         end_date_str = end_year_var.get() + '-' + end_month_var.get() + '-01'
-        graph.plot_monthly_purchases(start_date_str, end_date_str, purchases_var.get(), investments_var.get(), materials_var.get(), total_var.get())
+        db_worker.submit(monthly_purchases_window, graph.load_monthly_data, start_date_str, end_date_str,
+                         on_done=lambda data: chart.plot(*data, visible()), profile='reporting')
 
     monthly_purchases_window = tk.Toplevel()
     monthly_purchases_window.title("Compras Mensais")
-    monthly_purchases_window.geometry("400x300")
-    monthly_purchases_window.minsize(400, 300)
+    monthly_purchases_window.geometry("900x700")
+    monthly_purchases_window.minsize(600, 500)
+    db_worker.watch_busy(monthly_purchases_window)
 
     main_frame = ttk.Frame(monthly_purchases_window, padding="20 20 20 20")
     main_frame.pack(fill=tk.BOTH, expand=True)
@@ -54,7 +60,12 @@ def show_monthly_purchases():
     plot_button = ttk.Button(main_frame, text="Plotar", command=plot_data)
     plot_button.grid(row=3, column=0, columnspan=2, pady=(10, 0))
 
-    main_frame.grid_rowconfigure(3, weight=1)
+    chart = graph.MonthlyChart(main_frame)
+    chart.widget.grid(row=4, column=0, columnspan=2, pady=(10, 0), sticky="nsew")
+    for var in (purchases_var, investments_var, materials_var, total_var):
+        var.trace_add("write", lambda *args: chart.show_series(visible()))
+
+    main_frame.grid_rowconfigure(4, weight=1)
     main_frame.grid_columnconfigure(0, weight=1)
 
 if __name__ == "__main__":
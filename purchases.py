@@ -1,4 +1,3 @@
-import sqlite3
 import tkinter as tk
 from tkinter import messagebox, ttk
 from tkinter import TclError
@@ -7,43 +6,9 @@ import os
 import re
 from datetime import datetime  # Import datetime module
 
-DATABASE_PATH = 'food_supplier.db'
-
-
-def connect_to_db():
-    try:
-        conn = sqlite3.connect(DATABASE_PATH)
-        return conn
-    except sqlite3.Error as e:
-        log_error(f"Erro ao conectar-se ao banco de dados: {e}")
-        messagebox.showerror("Erro de Conexão", f"Erro ao conectar-se ao banco de dados: {e}")
-        return None
-
-
-def initialize_database():
-    with connect_to_db() as conn:
-        if conn is not None:
-            cursor = conn.cursor()
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS Compras (
-                purchase_id INTEGER PRIMARY KEY,
-                client_id INTEGER NOT NULL,
-                purchase_date TEXT NOT NULL,
-                total_amount REAL NOT NULL,
-                FOREIGN KEY (client_id) REFERENCES Clientes(client_id)
-            )
-            ''')
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS Purchase_Items (
-                id INTEGER PRIMARY KEY,
-                purchase_id INTEGER NOT NULL,
-                recipe_id INTEGER NOT NULL,
-                quantity REAL NOT NULL,
-                FOREIGN KEY (purchase_id) REFERENCES Compras(purchase_id),
-                FOREIGN KEY (recipe_id) REFERENCES Receitas(recipe_id)
-            )
-            ''')
-            conn.commit()
+import data_access
+import db_worker
+from virtual_list import VirtualListbox
 
 
 def load_icon(icon_path, size=(20, 20)):
@@ -53,32 +18,103 @@ def load_icon(icon_path, size=(20, 20)):
 
 
 def get_clients():
-    with connect_to_db() as conn:
-        if conn is not None:
-            cursor = conn.cursor()
-            cursor.execute('SELECT client_id, client_name FROM Clientes')
-            clients = cursor.fetchall()
-            return clients
-    return []
+    return data_access.fetch_client_choices()
 
 
 def get_recipes():
-    with connect_to_db() as conn:
-        if conn is not None:
-            cursor = conn.cursor()
-            cursor.execute('SELECT recipe_id, recipe_name, selling_price FROM Receitas')
-            recipes = cursor.fetchall()
-            return recipes
-    return []
+    return data_access.fetch_recipe_choices()
+
+
+def recipe_label(recipe):
+    return f"{recipe[1]} - R${recipe[2]:.2f}"
+
+
+class OrderTotal:
+    """Live total of the purchase form.
+
+    Recipes are looked up by their combobox label in a dict built once per
+    window, each line keeps its subtotal and the total moves by the change
+    of the edited line only. Trace callbacks just mark the line; the label
+    is updated once per idle cycle however many writes happened.
+    """
+
+    def __init__(self, widget, recipes, total_amount_var, discount_var, discount_percentage_var, discount_check_var):
+        self.widget = widget
+        self.labels = [recipe_label(recipe) for recipe in recipes]
+        self.recipes_by_label = {}
+        for label, recipe in zip(self.labels, recipes):
+            self.recipes_by_label.setdefault(label, recipe)
+        self.total_amount_var = total_amount_var
+        self.discount_var = discount_var
+        self.discount_percentage_var = discount_percentage_var
+        self.discount_check_var = discount_check_var
+        self.subtotals = {}
+        self.invalid = set()
+        self.subtotal = 0.0
+        self.changed = {}
+        self.pending = None
+
+    def recipe_for(self, label):
+        return self.recipes_by_label.get(label)
+
+    def line_changed(self, item_var, quantity_var):
+        self.changed[str(item_var)] = (item_var, quantity_var)
+        if self.pending is None:
+            self.pending = self.widget.after_idle(self.update)
+
+    def update(self):
+        self.pending = None
+        for key, (item_var, quantity_var) in self.changed.items():
+            recipe = self.recipe_for(item_var.get())
+            try:
+                line_total = (recipe[2] if recipe else 0) * float(quantity_var.get() or 0)
+                self.invalid.discard(key)
+            except (ValueError, TclError):
+                line_total = 0.0
+                self.invalid.add(key)
+            self.subtotal += line_total - self.subtotals.get(key, 0.0)
+            self.subtotals[key] = line_total
+        self.changed.clear()
+        self.show()
+
+    def show(self):
+        if self.invalid:
+            self.total_amount_var.set("Total: R$0.00")
+            return
+        try:
+            total_amount = self.subtotal
+            if self.discount_check_var.get():
+                discount = float(self.discount_var.get().replace(',', '.')) if self.discount_var.get() else 0
+                discount_percentage = float(
+                    self.discount_percentage_var.get().replace(',', '.')) if self.discount_percentage_var.get() else 0
+                total_amount -= discount
+                total_amount -= (total_amount * (discount_percentage / 100))
+            self.total_amount_var.set(f"Total: R${total_amount:.2f}")
+        except ValueError:
+            self.total_amount_var.set("Total: R$0.00")
+
+    def clear(self):
+        if self.pending is not None:
+            self.widget.after_cancel(self.pending)
+            self.pending = None
+        self.subtotals.clear()
+        self.invalid.clear()
+        self.changed.clear()
+        self.subtotal = 0.0
+        self.total_amount_var.set("Total: R$0.00")
 
 
 def add_purchase(client_id, purchase_date, total_amount, items, status_label, purchase_listbox, client_dropdown,
-                 date_entry, item_frames, item_vars, quantity_vars, total_amount_var, item_frame_container,
-                 discount_var, discount_percentage_var, discount_check_var, recipes):
+                 date_entry, item_frames, item_vars, quantity_vars, item_frame_container,
+                 discount_var, discount_percentage_var, discount_check_var, order_total):
     if not client_id or not purchase_date or not items:
         status_label.config(text="Todos os campos são obrigatórios", foreground="red")
         return
 
+    if any(item['recipe_id'] is None for item in items):
+        status_label.config(text="Selecione uma receita da lista em cada item", foreground="red")
+        return
+
     try:
         total_amount = float(total_amount.replace(',', '.'))
     except ValueError:
@@ -89,34 +125,27 @@ def add_purchase(client_id, purchase_date, total_amount, items, status_label, pu
         status_label.config(text="Data inválida. Use DD/MM/AAAA.", foreground="red")
         return
 
-    try:
-        formatted_purchase_date = datetime.strptime(purchase_date, "%d/%m/%Y").strftime("%Y-%m-%d")
-        with connect_to_db() as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-            INSERT INTO Compras (client_id, purchase_date, total_amount) VALUES (?, ?, ?)
-            ''', (client_id, formatted_purchase_date, total_amount))
-            purchase_id = cursor.lastrowid
-            for item in items:
-                cursor.execute('''
-                INSERT INTO Purchase_Items (purchase_id, recipe_id, quantity) VALUES (?, ?, ?)
-                ''', (purchase_id, item['recipe_id'], item['quantity']))
-            conn.commit()
-            status_label.config(text=f"Compra adicionada com sucesso", foreground="green")
-            update_purchase_list(purchase_listbox)
-            clear_form(client_dropdown, date_entry, total_amount_var, item_frame_container, item_frames, item_vars,
-                       quantity_vars, discount_var, discount_percentage_var, discount_check_var, recipes)
-    except sqlite3.Error as e:
+    def saved(ids):
+        status_label.config(text=f"Compra adicionada com sucesso", foreground="green")
+        update_purchase_list(purchase_listbox)
+        clear_form(client_dropdown, date_entry, item_frame_container, item_frames, item_vars,
+                   quantity_vars, discount_var, discount_percentage_var, discount_check_var, order_total)
+
+    def failed(e):
         log_error(f"Erro ao adicionar compra: {e}")
         messagebox.showerror("Erro", f"Erro ao adicionar compra: {e}")
 
+    formatted_purchase_date = datetime.strptime(purchase_date, "%d/%m/%Y").strftime("%Y-%m-%d")
+    db_worker.submit(purchase_listbox, data_access.insert_purchase, client_id, formatted_purchase_date, total_amount,
+                     [(item['recipe_id'], item['quantity']) for item in items], on_done=saved, on_error=failed,
+                     cancellable=False)
 
-def clear_form(client_dropdown, date_entry, total_amount_var, item_frame_container, item_frames, item_vars,
-               quantity_vars, discount_var, discount_percentage_var, discount_check_var, recipes):
+
+def clear_form(client_dropdown, date_entry, item_frame_container, item_frames, item_vars,
+               quantity_vars, discount_var, discount_percentage_var, discount_check_var, order_total):
     client_dropdown.set('')
     date_entry.delete(0, tk.END)
     date_entry.insert(0, datetime.now().strftime("%d/%m/%Y"))
-    total_amount_var.set("Total: R$0.00")
     discount_var.set("0,00")
     discount_percentage_var.set("0,00")
     discount_check_var.set(False)
@@ -126,39 +155,26 @@ def clear_form(client_dropdown, date_entry, total_amount_var, item_frame_contain
     item_frames.clear()
     item_vars.clear()
     quantity_vars.clear()
+    order_total.clear()
+
+    add_item_frame(item_frame_container, item_frames, item_vars, quantity_vars, order_total)
+
 
-    add_item_frame(item_frame_container, recipes, item_frames, item_vars, quantity_vars, total_amount_var, discount_var,
-                   discount_percentage_var, discount_check_var)
+def format_purchase(purchase):
+    return f"{purchase[0]} - Cliente: {purchase[1]} - Data: {purchase[2]} - Total: R${purchase[3]:.2f}"
 
 
 def update_purchase_list(listbox):
-    try:
-        with connect_to_db() as conn:
-            if conn is not None:
-                cursor = conn.cursor()
-                cursor.execute('''
-                SELECT c.purchase_id, cl.client_name, c.purchase_date, c.total_amount
-                FROM Compras c
-                JOIN Clientes cl ON c.client_id = cl.client_id
-                ''')
-                purchases = cursor.fetchall()
-                listbox.delete(0, tk.END)
-                for purchase in purchases:
-                    listbox.insert(tk.END,
-                                   f"{purchase[0]} - Cliente: {purchase[1]} - Data: {purchase[2]} - Total: R${purchase[3]:.2f}")
-    except sqlite3.Error as e:
-        log_error(f"Erro ao atualizar lista de compras: {e}")
-        messagebox.showerror("Erro", f"Erro ao atualizar lista de compras: {e}")
-
-
-def add_item_frame(main_frame, recipes, item_frames, item_vars, quantity_vars, total_amount_var, discount_var,
-                   discount_percentage_var, discount_check_var):
+    listbox.refresh()
+
+
+def add_item_frame(main_frame, item_frames, item_vars, quantity_vars, order_total):
     frame = ttk.Frame(main_frame)
     frame.pack(fill=tk.X, pady=5)
 
     item_var = tk.StringVar()
     item_vars.append(item_var)
-    item_dropdown = ttk.Combobox(frame, textvariable=item_var, values=[f"{i[1]} - R${i[2]:.2f}" for i in recipes])
+    item_dropdown = ttk.Combobox(frame, textvariable=item_var, values=order_total.labels)
     item_dropdown.grid(row=0, column=0, padx=(0, 10), sticky="ew")
     item_dropdown.current(0)
 
@@ -169,43 +185,18 @@ def add_item_frame(main_frame, recipes, item_frames, item_vars, quantity_vars, t
     quantity_entry = ttk.Entry(frame, textvariable=quantity_var)
     quantity_entry.grid(row=0, column=2, padx=(0, 10), sticky="ew")
 
-    # **Highlight: Add callbacks to update total amount when item or quantity changes**
+    # Update the total when the item or its quantity changes
     def on_item_change(*args):
-        update_total_amount(item_vars, quantity_vars, total_amount_var, discount_var, discount_percentage_var,
-                            discount_check_var, recipes)
+        order_total.line_changed(item_var, quantity_var)
 
     item_var.trace_add("write", on_item_change)
     quantity_var.trace_add("write", on_item_change)
+    # current(0) above ran before the traces existed
+    order_total.line_changed(item_var, quantity_var)
 
     item_frames.append(frame)
 
 
-def update_total_amount(item_vars, quantity_vars, total_amount_var, discount_var, discount_percentage_var,
-                        discount_check_var, recipes):
-    try:
-        total_amount = 0
-        for item_var, quantity_var in zip(item_vars, quantity_vars):
-            item_name_price = item_var.get()
-            quantity = float(quantity_var.get() or 0)
-            price = next((r[2] for r in recipes if f"{r[1]} - R${r[2]:.2f}" == item_name_price), 0)
-            total_amount += price * quantity
-        if discount_check_var.get():
-            discount = float(discount_var.get().replace(',', '.')) if discount_var.get() else 0
-            discount_percentage = float(
-                discount_percentage_var.get().replace(',', '.')) if discount_percentage_var.get() else 0
-            total_amount -= discount
-            total_amount -= (total_amount * (discount_percentage / 100))
-        total_amount_var.set(f"Total: R${total_amount:.2f}")
-    except (ValueError, TclError):
-        total_amount_var.set("Total: R$0.00")
-
-
-def apply_discount(item_vars, quantity_vars, total_amount_var, discount_var, discount_percentage_var,
-                   discount_check_var, recipes):
-    update_total_amount(item_vars, quantity_vars, total_amount_var, discount_var, discount_percentage_var,
-                        discount_check_var, recipes)
-
-
 def log_error(message):
     with open('error.log', 'a') as f:
         f.write(message + '\n')
@@ -230,12 +221,11 @@ def format_date(event):
 
 
 def open_add_purchase_window(root, status_label):
-    initialize_database()
-
     add_purchase_window = tk.Toplevel(root)
     add_purchase_window.title("Adicionar Compra")
     add_purchase_window.geometry("700x700")
     add_purchase_window.minsize(700, 700)
+    db_worker.watch_busy(add_purchase_window)
 
     # Create the main frame
     main_frame = ttk.Frame(add_purchase_window, padding="20 20 20 20")
@@ -299,9 +289,7 @@ def open_add_purchase_window(root, status_label):
     discount_percentage_entry.grid(row=5, column=1, columnspan=3, sticky="ew")
 
     apply_discount_button = ttk.Button(form_frame, text="Aplicar Descontos", state='disabled',
-                                       command=lambda: apply_discount(item_vars, quantity_vars, total_amount_var,
-                                                                      discount_var, discount_percentage_var,
-                                                                      discount_check_var, recipes))
+                                       command=lambda: order_total.show())
     apply_discount_button.grid(row=6, column=0, columnspan=4, pady=(10, 20), sticky="ew")
 
     def toggle_discount_entries():
@@ -312,13 +300,13 @@ def open_add_purchase_window(root, status_label):
 
     discount_check_var.trace_add("write", lambda *args: toggle_discount_entries())
 
-    add_item_frame(item_frame_container, recipes, item_frames, item_vars, quantity_vars, total_amount_var, discount_var,
-                   discount_percentage_var, discount_check_var)
+    order_total = OrderTotal(add_purchase_window, recipes, total_amount_var, discount_var, discount_percentage_var,
+                             discount_check_var)
+    add_item_frame(item_frame_container, item_frames, item_vars, quantity_vars, order_total)
 
     add_item_button = ttk.Button(form_frame, text="Adicionar Item",
-                                 command=lambda: add_item_frame(item_frame_container, recipes, item_frames, item_vars,
-                                                                quantity_vars, total_amount_var, discount_var,
-                                                                discount_percentage_var, discount_check_var))
+                                 command=lambda: add_item_frame(item_frame_container, item_frames, item_vars,
+                                                                quantity_vars, order_total))
     add_item_button.grid(row=7, column=3, pady=(10, 20), sticky="e")
 
     total_amount_label = ttk.Label(form_frame, textvariable=total_amount_var, font=("Helvetica", 12, "bold"))
@@ -342,7 +330,7 @@ def open_add_purchase_window(root, status_label):
                                          clients[client_dropdown.current()][0],
                                          date_entry.get(),
                                          total_amount_var.get().split(': R$')[1],
-                                         [{'recipe_id': recipes[item_vars.index(item_var)][0],
+                                         [{'recipe_id': (order_total.recipe_for(item_var.get()) or (None,))[0],
                                            'quantity': quantity.get()} for item_var, quantity in
                                           zip(item_vars, quantity_vars)],
                                          status_label,
@@ -352,12 +340,11 @@ def open_add_purchase_window(root, status_label):
                                          item_frames,
                                          item_vars,
                                          quantity_vars,
-                                         total_amount_var,
                                          item_frame_container,
                                          discount_var,
                                          discount_percentage_var,
                                          discount_check_var,
-                                         recipes
+                                         order_total
                                      ))
     add_purchase_button.pack(side=tk.LEFT, expand=True, fill=tk.X, padx=(0, 10))
 
@@ -367,18 +354,18 @@ def open_add_purchase_window(root, status_label):
             messagebox.showerror("Erro", "Nenhuma compra selecionada.")
             return
         purchase_id = purchase_listbox.get(selected[0]).split(' - ')[0]
-        try:
-            with connect_to_db() as conn:
-                cursor = conn.cursor()
-                cursor.execute('DELETE FROM Purchase_Items WHERE purchase_id = ?', (purchase_id,))
-                cursor.execute('DELETE FROM Compras WHERE purchase_id = ?', (purchase_id,))
-                conn.commit()
-                update_purchase_list(purchase_listbox)
-                status_label.config(text=f"Compra {purchase_id} deletada com sucesso", foreground="green")
-        except sqlite3.Error as e:
+
+        def deleted(result):
+            update_purchase_list(purchase_listbox)
+            status_label.config(text=f"Compra {purchase_id} deletada com sucesso", foreground="green")
+
+        def failed(e):
             log_error(f"Erro ao deletar compra: {e}")
             messagebox.showerror("Erro", f"Erro ao deletar compra: {e}")
 
+        db_worker.submit(purchase_listbox, data_access.delete_purchase, purchase_id, on_done=deleted, on_error=failed,
+                         cancellable=False)
+
     delete_button = ttk.Button(button_frame, text="Deletar Compra", command=delete_purchase)
     delete_button.pack(side=tk.LEFT, expand=True, fill=tk.X, padx=(10, 0))
 
@@ -386,13 +373,14 @@ def open_add_purchase_window(root, status_label):
     list_frame = ttk.Frame(main_frame)
     list_frame.grid(row=11, column=0, columnspan=4, pady=20, sticky="nsew")
 
-    purchase_listbox = tk.Listbox(list_frame, width=50, height=10)
+    purchase_listbox = VirtualListbox(list_frame, data_access.fetch_purchases_page, data_access.purchase_page_key,
+                                      format_purchase, width=50, height=10)
     purchase_listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
 
     scrollbar = ttk.Scrollbar(list_frame, orient="vertical", command=purchase_listbox.yview)
     scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
 
-    purchase_listbox.config(yscrollcommand=scrollbar.set)
+    purchase_listbox.attach_scrollbar(scrollbar)
 
     main_frame.grid_rowconfigure(11, weight=1)
     main_frame.grid_columnconfigure(0, weight=1)
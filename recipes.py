@@ -1,57 +1,13 @@
-import sqlite3
 import tkinter as tk
 from tkinter import messagebox, ttk
 from PIL import Image, ImageTk
 import os
 
-DATABASE_PATH = 'food_supplier.db'
-
-
-def connect_to_db():
-    try:
-        conn = sqlite3.connect(DATABASE_PATH)
-        return conn
-    except sqlite3.Error as e:
-        messagebox.showerror("Erro de Conexão", f"Erro ao conectar-se ao banco de dados: {e}")
-        return None
-
-
-def initialize_database():
-    conn = connect_to_db()
-    if conn is not None:
-        cursor = conn.cursor()
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS Receitas (
-            recipe_id INTEGER PRIMARY KEY,
-            recipe_name TEXT NOT NULL,
-            total_price REAL NOT NULL,
-            selling_price REAL NOT NULL,
-            mao_de_obra REAL DEFAULT 0,
-            gas_agua_luz REAL DEFAULT 0,
-            porcoes INTEGER DEFAULT 1
-        )
-        ''')
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS Recipe_Ingredients (
-            id INTEGER PRIMARY KEY,
-            recipe_id INTEGER NOT NULL,
-            ingredient_id INTEGER NOT NULL,
-            quantity REAL NOT NULL,
-            FOREIGN KEY (recipe_id) REFERENCES Receitas(recipe_id),
-            FOREIGN KEY (ingredient_id) REFERENCES Ingredientes(ingredient_id)
-        )
-        ''')
-        # Check if columns exist, and add them if not
-        cursor.execute("PRAGMA table_info(Receitas)")
-        columns = [column[1] for column in cursor.fetchall()]
-        if "mao_de_obra" not in columns:
-            cursor.execute("ALTER TABLE Receitas ADD COLUMN mao_de_obra REAL DEFAULT 0")
-        if "gas_agua_luz" not in columns:
-            cursor.execute("ALTER TABLE Receitas ADD COLUMN gas_agua_luz REAL DEFAULT 0")
-        if "porcoes" not in columns:
-            cursor.execute("ALTER TABLE Receitas ADD COLUMN porcoes INTEGER DEFAULT 1")
-        conn.commit()
-        conn.close()
+import costing
+import data_access
+import db_worker
+import migrations
+import tree_sync
 
 
 def delete_recipe(recipe_listbox, status_label):
@@ -60,40 +16,31 @@ def delete_recipe(recipe_listbox, status_label):
         messagebox.showwarning("Erro de Seleção", "Nenhuma receita selecionada", parent=status_label.master)
         return
     recipe_id = int(recipe_listbox.item(selected_item[0], 'values')[0])
-    conn = connect_to_db()
-    if conn is not None:
-        cursor = conn.cursor()
-        cursor.execute('DELETE FROM Receitas WHERE recipe_id = ?', (recipe_id,))
-        cursor.execute('DELETE FROM Recipe_Ingredients WHERE recipe_id = ?', (recipe_id,))
-        conn.commit()
-        conn.close()
-        messagebox.showinfo("Sucesso", "Receita excluída com sucesso!", parent=status_label.master)
-        update_recipe_list(recipe_listbox)
-        status_label.config(text=f"Receita ID '{recipe_id}' excluída com sucesso.")
+    data_access.delete_recipe(recipe_id)
+    messagebox.showinfo("Sucesso", "Receita excluída com sucesso!", parent=status_label.master)
+    update_recipe_list(recipe_listbox)
+    status_label.config(text=f"Receita ID '{recipe_id}' excluída com sucesso.")
 
 
 def update_recipe_list(treeview):
-    conn = connect_to_db()
-    if conn is not None:
-        cursor = conn.cursor()
-        cursor.execute('SELECT recipe_id, recipe_name, total_price, selling_price, mao_de_obra, gas_agua_luz, porcoes FROM Receitas')
-        recipes = cursor.fetchall()
-        for row in treeview.get_children():
-            treeview.delete(row)
-        for recipe in recipes:
-            gastos = recipe[2] + (recipe[4] / 100 * recipe[2]) + (recipe[5] / 100 * recipe[2])
-            total_price = recipe[3] * recipe[6]
-            profit = total_price - gastos
-            treeview.insert('', tk.END, values=(recipe[0], recipe[1], gastos, total_price, recipe[4], recipe[5], profit))
-        conn.close()
+    # Costs come from the current ingredient prices, priced for all recipes at once.
+    db_worker.submit(treeview, costing.recipe_rows, on_done=lambda recipes: show_recipes(treeview, recipes))
+
+
+def show_recipes(treeview, recipes):
+    tree_sync.reconcile(treeview, [(recipe[0], recipe) for recipe in recipes])
 
 
 def add_recipe(recipe_name, selling_price, mao_de_obra, gas_agua_luz, porcoes, ingredients, status_label, treeview, recipe_name_entry,
-               selling_price_entry, mao_de_obra_entry, gas_agua_luz_entry, porcoes_entry, ingredient_frames):
+               selling_price_entry, mao_de_obra_entry, gas_agua_luz_entry, porcoes_entry, ingredient_frames, recipe_cost):
     if not recipe_name or not selling_price or not mao_de_obra or not gas_agua_luz or not porcoes or not ingredients:
         status_label.config(text="Todos os campos são obrigatórios", foreground="red")
         return
 
+    if None in ingredients:
+        status_label.config(text="Selecione um ingrediente da lista em cada linha", foreground="red")
+        return
+
     try:
         selling_price = float(selling_price.replace(',', '.'))
         mao_de_obra = float(mao_de_obra)
@@ -106,24 +53,15 @@ def add_recipe(recipe_name, selling_price, mao_de_obra, gas_agua_luz, porcoes, i
     total_price = sum(ingredient['price_per_unit'] * ingredient['quantity'] for ingredient in ingredients.values())
     gastos = total_price + (mao_de_obra / 100 * total_price) + (gas_agua_luz / 100 * total_price)
 
-    conn = connect_to_db()
-    if conn is not None:
-        cursor = conn.cursor()
-        cursor.execute('''
-        INSERT INTO Receitas (recipe_name, total_price, selling_price, mao_de_obra, gas_agua_luz, porcoes) VALUES (?, ?, ?, ?, ?, ?)
-        ''', (recipe_name, total_price, selling_price, mao_de_obra, gas_agua_luz, porcoes))
-        recipe_id = cursor.lastrowid
-        for ingredient_id, ingredient in ingredients.items():
-            cursor.execute('''
-            INSERT INTO Recipe_Ingredients (recipe_id, ingredient_id, quantity) VALUES (?, ?, ?)
-            ''', (recipe_id, ingredient_id, ingredient['quantity']))
-        conn.commit()
-        conn.close()
-        status_label.config(text=f"Receita '{recipe_name}' adicionada com sucesso", foreground="green")
-        update_recipe_list(treeview)
-        clear_form(recipe_name_entry, selling_price_entry, mao_de_obra_entry, gas_agua_luz_entry, porcoes_entry)
-        for frame in ingredient_frames:
-            frame.destroy()
+    data_access.insert_recipe(recipe_name, total_price, selling_price, mao_de_obra, gas_agua_luz, porcoes,
+                              [(ingredient_id, ingredient['quantity']) for ingredient_id, ingredient in ingredients.items()])
+    status_label.config(text=f"Receita '{recipe_name}' adicionada com sucesso", foreground="green")
+    update_recipe_list(treeview)
+    clear_form(recipe_name_entry, selling_price_entry, mao_de_obra_entry, gas_agua_luz_entry, porcoes_entry)
+    for frame in ingredient_frames:
+        frame.destroy()
+    ingredient_frames.clear()
+    recipe_cost.clear()
 
 
 def clear_form(*fields):
@@ -138,14 +76,7 @@ def load_icon(icon_path, size=(20, 20)):
 
 
 def get_ingredients():
-    conn = connect_to_db()
-    if conn is not None:
-        cursor = conn.cursor()
-        cursor.execute('SELECT ingredient_id, ingredient_name, price_per_unit FROM Ingredientes WHERE is_active = 1')
-        ingredients = cursor.fetchall()
-        conn.close()
-        return ingredients
-    return []
+    return data_access.fetch_ingredient_choices()
 
 
 def safe_float_conversion(value):
@@ -157,63 +88,145 @@ def safe_float_conversion(value):
         return 0.0
 
 
-def add_ingredient_frame(main_frame, ingredients, ingredient_frames, ingredient_vars, price_vars, quantity_vars, total_cost_var, full_price_var, profit_var, selling_price_entry, porcoes_entry, mao_de_obra_entry, gas_agua_luz_entry):
+def ingredient_label(ingredient):
+    return f"{ingredient[1]} - R${ingredient[2]:.2f}"
+
+
+class RecipeCost:
+    """Live cost and profit of the recipe form.
+
+    Each ingredient row keeps its contribution (price x quantity) to one
+    running cost, so an edit recomputes only its own row; the four shared
+    entries are parsed again only after one of them is edited. Changes are
+    collected and the labels updated once per idle cycle.
+    """
+
+    def __init__(self, widget, ingredients, total_cost_var, full_price_var, profit_var, selling_price_entry,
+                 porcoes_entry, mao_de_obra_entry, gas_agua_luz_entry):
+        self.widget = widget
+        self.labels = [ingredient_label(ingredient) for ingredient in ingredients]
+        self.ingredients_by_label = {}
+        for label, ingredient in zip(self.labels, ingredients):
+            self.ingredients_by_label.setdefault(label, ingredient)
+        self.total_cost_var = total_cost_var
+        self.full_price_var = full_price_var
+        self.profit_var = profit_var
+        self.selling_price_entry = selling_price_entry
+        self.porcoes_entry = porcoes_entry
+        self.mao_de_obra_entry = mao_de_obra_entry
+        self.gas_agua_luz_entry = gas_agua_luz_entry
+        self.rows = {}
+        self.contributions = {}
+        self.cost = 0.0
+        self.figures = None
+        self.changed = set()
+        self.fields_changed = True
+        self.pending = None
+        # Bound once for the window, not once per ingredient row.
+        for entry in (selling_price_entry, porcoes_entry, mao_de_obra_entry, gas_agua_luz_entry):
+            entry.bind("<KeyRelease>", self.fields_edited, add='+')
+
+    def add_row(self, ingredient_var, quantity_var):
+        key = str(ingredient_var)
+        self.rows[key] = (ingredient_var, quantity_var)
+        ingredient_var.trace_add("write", lambda *args: self.row_changed(key))
+        quantity_var.trace_add("write", lambda *args: self.row_changed(key))
+        self.row_changed(key)
+
+    def row_changed(self, key):
+        self.changed.add(key)
+        self.schedule()
+
+    def fields_edited(self, event=None):
+        self.fields_changed = True
+        self.schedule()
+
+    def schedule(self):
+        if self.pending is None:
+            self.pending = self.widget.after_idle(self.update)
+
+    def update(self):
+        self.pending = None
+        for key in self.changed:
+            if key not in self.rows:
+                continue
+            ingredient_var, quantity_var = self.rows[key]
+            ingredient = self.ingredients_by_label.get(ingredient_var.get())
+            contribution = (ingredient[2] if ingredient else 0.0) * safe_float_conversion(quantity_var.get())
+            self.cost += contribution - self.contributions.get(key, 0.0)
+            self.contributions[key] = contribution
+        self.changed.clear()
+        if self.fields_changed:
+            self.fields_changed = False
+            try:
+                self.figures = (float(self.selling_price_entry.get().replace(',', '.')),
+                                int(self.porcoes_entry.get()),
+                                float(self.mao_de_obra_entry.get().replace(',', '.')),
+                                float(self.gas_agua_luz_entry.get().replace(',', '.')))
+            except ValueError:
+                self.figures = None
+        self.show()
+
+    def show(self):
+        self.total_cost_var.set(f"Gastos: R${self.cost:.2f}")
+        if self.figures is None:
+            self.full_price_var.set("Preço Total: R$0.00")
+            self.profit_var.set("Lucro: R$0.00")
+            return
+        selling_price, porcoes, mao_de_obra, gas_agua_luz = self.figures
+        total_price = selling_price * porcoes
+        self.full_price_var.set(f"Preço Total: R${total_price:.2f}")
+        gastos = self.cost + (mao_de_obra / 100 * self.cost) + (gas_agua_luz / 100 * self.cost)
+        self.profit_var.set(f"Lucro: R${total_price - gastos:.2f}")
+
+    def selected_ingredients(self):
+        """{ingredient_id: {'price_per_unit', 'quantity'}} for add_recipe; None stands for an unknown ingredient."""
+        selected = {}
+        for ingredient_var, quantity_var in self.rows.values():
+            ingredient = self.ingredients_by_label.get(ingredient_var.get())
+            if ingredient is None:
+                selected[None] = None
+            else:
+                selected[ingredient[0]] = {'price_per_unit': ingredient[2],
+                                           'quantity': safe_float_conversion(quantity_var.get())}
+        return selected
+
+    def clear(self):
+        if self.pending is not None:
+            self.widget.after_cancel(self.pending)
+            self.pending = None
+        self.rows.clear()
+        self.contributions.clear()
+        self.changed.clear()
+        self.cost = 0.0
+        self.fields_changed = True
+        self.update()
+
+
+def add_ingredient_frame(main_frame, ingredient_frames, recipe_cost):
     frame = ttk.Frame(main_frame)
     frame.pack(fill=tk.X, pady=5)
 
     ingredient_var = tk.StringVar()
-    ingredient_vars.append(ingredient_var)
-    ingredient_dropdown = ttk.Combobox(frame, textvariable=ingredient_var, values=[f"{i[1]} - R${i[2]:.2f}" for i in ingredients])
+    ingredient_dropdown = ttk.Combobox(frame, textvariable=ingredient_var, values=recipe_cost.labels)
     ingredient_dropdown.grid(row=0, column=0, padx=(0, 10), sticky="ew")
     ingredient_dropdown.current(0)
 
-    price_var = tk.DoubleVar(value=ingredients[0][2])
-    price_vars.append(price_var)
-
     ttk.Label(frame, text="Quantidade:").grid(row=0, column=1, sticky="w", padx=(5, 2))
     quantity_var = tk.StringVar(value="1.0")  # Default quantity
-    quantity_vars.append(quantity_var)
     quantity_entry = ttk.Entry(frame, textvariable=quantity_var)
     quantity_entry.grid(row=0, column=2, padx=(0, 10), sticky="ew")
 
-    def update_total_cost(*args):
-        total_cost = sum(safe_float_conversion(price.get()) * safe_float_conversion(quantity.get()) for price, quantity in zip(price_vars, quantity_vars))
-        total_cost_var.set(f"Gastos: R${total_cost:.2f}")
-
-        try:
-            selling_price = float(selling_price_entry.get().replace(',', '.'))
-            porcoes = int(porcoes_entry.get())
-            mao_de_obra = float(mao_de_obra_entry.get().replace(',', '.'))
-            gas_agua_luz = float(gas_agua_luz_entry.get().replace(',', '.'))
-
-            total_price = selling_price * porcoes
-            full_price_var.set(f"Preço Total: R${total_price:.2f}")
-
-            gastos = total_cost + (mao_de_obra / 100 * total_cost) + (gas_agua_luz / 100 * total_cost)
-            lucro = total_price - gastos
-            profit_var.set(f"Lucro: R${lucro:.2f}")
-        except ValueError:
-            full_price_var.set("Preço Total: R$0.00")
-            profit_var.set("Lucro: R$0.00")
-
-    ingredient_var.trace_add("write", update_total_cost)
-    quantity_var.trace_add("write", update_total_cost)
-    selling_price_entry.bind("<KeyRelease>", update_total_cost)
-    porcoes_entry.bind("<KeyRelease>", update_total_cost)
-    mao_de_obra_entry.bind("<KeyRelease>", update_total_cost)
-    gas_agua_luz_entry.bind("<KeyRelease>", update_total_cost)
-
+    recipe_cost.add_row(ingredient_var, quantity_var)
     ingredient_frames.append(frame)
 
-    # Trigger the update function initially
-    update_total_cost()
-
 
 def open_add_recipe_window(root):
     add_recipe_window = tk.Toplevel(root)
     add_recipe_window.title("Adicionar Receita")
     add_recipe_window.geometry("700x700")
     add_recipe_window.minsize(700, 700)
+    db_worker.watch_busy(add_recipe_window)
 
     # Create the main frame
     main_frame = ttk.Frame(add_recipe_window, padding="20 20 20 20")
@@ -259,9 +272,6 @@ def open_add_recipe_window(root):
     ingredient_frame_container.grid(row=5, column=1, columnspan=3, sticky="ew")
 
     ingredient_frames = []
-    ingredient_vars = []
-    price_vars = []
-    quantity_vars = []
     total_cost_var = tk.StringVar(value="Gastos: R$0.00")
     full_price_var = tk.StringVar(value="Preço Total: R$0.00")
     profit_var = tk.StringVar(value="Lucro: R$0.00")
@@ -272,9 +282,11 @@ def open_add_recipe_window(root):
         add_recipe_window.destroy()
         return
 
-    add_ingredient_frame(ingredient_frame_container, ingredients, ingredient_frames, ingredient_vars, price_vars, quantity_vars, total_cost_var, full_price_var, profit_var, selling_price_entry, porcoes_entry, mao_de_obra_entry, gas_agua_luz_entry)
+    recipe_cost = RecipeCost(add_recipe_window, ingredients, total_cost_var, full_price_var, profit_var,
+                             selling_price_entry, porcoes_entry, mao_de_obra_entry, gas_agua_luz_entry)
+    add_ingredient_frame(ingredient_frame_container, ingredient_frames, recipe_cost)
 
-    add_ingredient_button = ttk.Button(form_frame, text="Adicionar Ingrediente", command=lambda: add_ingredient_frame(ingredient_frame_container, ingredients, ingredient_frames, ingredient_vars, price_vars, quantity_vars, total_cost_var, full_price_var, profit_var, selling_price_entry, porcoes_entry, mao_de_obra_entry, gas_agua_luz_entry))
+    add_ingredient_button = ttk.Button(form_frame, text="Adicionar Ingrediente", command=lambda: add_ingredient_frame(ingredient_frame_container, ingredient_frames, recipe_cost))
     add_ingredient_button.grid(row=6, column=3, pady=(10, 20), sticky="e")
 
     total_cost_label = ttk.Label(form_frame, textvariable=total_cost_var, font=("Helvetica", 12, "bold"))
@@ -308,7 +320,7 @@ def open_add_recipe_window(root):
                                        mao_de_obra_entry.get(),
                                        gas_agua_luz_entry.get(),
                                        porcoes_entry.get(),
-                                       {ingredients[i][0]: {'price_per_unit': price.get(), 'quantity': safe_float_conversion(quantity.get())} for i, (price, quantity) in enumerate(zip(price_vars, quantity_vars))},
+                                       recipe_cost.selected_ingredients(),
                                        status_label,
                                        recipe_listbox,
                                        recipe_name_entry,
@@ -316,7 +328,8 @@ def open_add_recipe_window(root):
                                        mao_de_obra_entry,
                                        gas_agua_luz_entry,
                                        porcoes_entry,
-                                       ingredient_frames
+                                       ingredient_frames,
+                                       recipe_cost
                                    ))
     add_recipe_button.pack(side=tk.LEFT, expand=True, fill=tk.X, padx=(0, 10))
 
@@ -362,7 +375,7 @@ def main():
     recipe_button = ttk.Button(main_frame, text="Adicionar Receita", command=lambda: open_add_recipe_window(root))
     recipe_button.pack(pady=(0, 20))
 
-    initialize_database()
+    migrations.run_migrations()
 
     root.mainloop()
 
@@ -0,0 +1,99 @@
+import re
+import unicodedata
+
+import data_access
+
+SEARCH_DELAY_MS = 250
+
+
+def normalize_words(text):
+    # Same folding as the FTS5 unicode61 tokenizer with remove_diacritics:
+    # lower case, accents stripped, split on anything that is not a letter or
+    # a digit.
+    decomposed = unicodedata.normalize('NFKD', text.lower())
+    stripped = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return re.findall(r'\w+', stripped)
+
+
+def matches_all_prefixes(words, row_words):
+    return all(any(row_word.startswith(word) for row_word in row_words) for word in words)
+
+
+class SearchController:
+    """Search-as-you-type for an entry feeding a list.
+
+    Keystrokes are debounced, so only the text present once typing pauses is
+    searched. Each search gets a generation number and results that come
+    back after a newer search started are dropped. When the new text only
+    extends the previous one, the previous (complete) result set is
+    filtered in memory instead of querying the database again.
+    """
+
+    def __init__(self, widget, search, render, row_text, delay=SEARCH_DELAY_MS, runner=None):
+        self.widget = widget
+        self.search = search
+        self.render = render
+        self.row_text = row_text
+        self.delay = delay
+        # runner(fn, term, on_done) runs the query, synchronously by default; it
+        # may return a job with cancel(), which is called when a newer search
+        # starts.
+        self.runner = runner or (lambda fn, term, on_done: on_done(fn(term)))
+        self._pending = None
+        self._job = None
+        self._generation = 0
+        self._cache = None  # (term, change token, rows with their folded words)
+
+    def schedule(self, term):
+        self.cancel()
+        self._pending = self.widget.after(self.delay, self._run, term)
+
+    def run_now(self, term):
+        self.cancel()
+        self._run(term)
+
+    def cancel(self):
+        if self._pending is not None:
+            self.widget.after_cancel(self._pending)
+            self._pending = None
+
+    def invalidate(self):
+        self._cache = None
+
+    def _run(self, term):
+        self._pending = None
+        if self._job is not None:
+            self._job.cancel()
+            self._job = None
+        self._generation += 1
+        generation = self._generation
+        token = data_access.change_token()
+
+        refined = self._refine(term, token)
+        if refined is not None:
+            self._finish(generation, term, token, refined)
+            return
+        self._job = self.runner(self.search, term, lambda rows: self._finish(generation, term, token, rows))
+
+    def _refine(self, term, token):
+        if self._cache is None:
+            return None
+        cached_term, cached_token, cached_rows = self._cache
+        if cached_token != token or not cached_term.strip() or not term.startswith(cached_term):
+            return None
+        if len(cached_rows) >= data_access.SEARCH_LIMIT:
+            # The cached result was truncated, so rows matching the longer text
+            # may be missing from it.
+            return None
+        words = normalize_words(term)
+        return [row for row, row_words in cached_rows if matches_all_prefixes(words, row_words)]
+
+    def _finish(self, generation, term, token, rows):
+        if generation != self._generation:
+            return
+        self._job = None
+        if rows is None:
+            self._cache = None
+        else:
+            self._cache = (term, token, [(row, normalize_words(self.row_text(row))) for row in rows])
+        self.render(rows)
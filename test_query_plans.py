@@ -0,0 +1,77 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import data_access
+import migrations
+
+SOURCE_DATABASE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'food_supplier.db')
+
+# Hot queries and the index each one must use. Run after changing a query or
+# the index set to make sure nothing falls back to a full table scan.
+EXPECTED_QUERY_PLANS = [
+    (data_access.SQL_SELECT_CLIENT_BY_NAME, ('Cliente',), 'idx_clientes_name'),
+    (data_access.SQL_SELECT_CLIENTS, (), 'idx_clientes_name'),
+    (data_access.SQL_DELETE_PURCHASE_ITEMS, (1,), 'idx_purchase_items_purchase'),
+    (data_access.SQL_DELETE_RECIPE_INGREDIENTS, (1,), 'idx_recipe_ingredients_recipe'),
+    (data_access.SQL_COUNT_RECIPES_USING_INGREDIENT, (1,), 'idx_recipe_ingredients_ingredient'),
+    (data_access.SQL_TOP_CUSTOMERS, (10,), 'idx_clientes_total_spent'),
+    (data_access.SQL_TOP_CUSTOMERS_FOR_MONTH, ('2024-01', 10), 'idx_clientes_month_spent'),
+    (data_access.SQL_BIRTHDAYS_FROM, ('06-15', 10), 'idx_clientes_birthday_md'),
+    (data_access.SQL_BIRTHDAYS_BEFORE, ('06-15', 10), 'idx_clientes_birthday_md'),
+    (data_access.SQL_ROLL_OVER_CLIENT_MONTH, ('2024-01', '2024-01-01', '2024-02-01', '2024-01'),
+     'idx_compras_client_date'),
+    (data_access.SQL_MONTHLY_PURCHASES, ('2024-01', '2024-12'), 'PRIMARY KEY'),
+    (data_access.SQL_MONTHLY_EXPENSES, ('2024-01', '2024-12'), 'PRIMARY KEY'),
+    (data_access.PURCHASE_PAGES['after'], (1000, 200), 'INTEGER PRIMARY KEY'),
+    (data_access.PURCHASE_PAGES['before'], (1000, 200), 'INTEGER PRIMARY KEY'),
+    (data_access.CLIENT_PAGES['after'], ('Cliente', 1, 200), 'idx_clientes_name'),
+    (data_access.CLIENT_PAGES['before'], ('Cliente', 1, 200), 'idx_clientes_name'),
+    (data_access.EXPENSE_PAGES['after'], ('2024-01-01', 1, 200), 'idx_despesas_date_id'),
+    (data_access.EXPENSE_PAGES['before'], ('2024-01-01', 1, 200), 'idx_despesas_date_id'),
+]
+
+
+class QueryPlanTest(unittest.TestCase):
+    """EXPLAIN QUERY PLAN of every hot query on freshly migrated scratch databases."""
+
+    def setUp(self):
+        self.original_path = data_access.DATABASE_PATH
+        self.scratch_dir = tempfile.mkdtemp(prefix='allegro_test_')
+
+    def tearDown(self):
+        data_access.close_connection()
+        data_access.DATABASE_PATH = self.original_path
+        migrations._applied = False
+        shutil.rmtree(self.scratch_dir)
+
+    def migrate(self, path):
+        data_access.close_connection()
+        data_access.DATABASE_PATH = path
+        migrations._applied = False
+        migrations.run_migrations()
+
+    def assert_query_plans(self):
+        conn = data_access.get_connection()
+        for query, params, index_name in EXPECTED_QUERY_PLANS:
+            with self.subTest(query=' '.join(query.split())):
+                plan = [row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + query, params)]
+                self.assertTrue(any(index_name in step for step in plan),
+                                f"Consulta não usa {index_name}: {plan}")
+
+    def test_new_database(self):
+        self.migrate(os.path.join(self.scratch_dir, 'food_supplier.db'))
+        self.assert_query_plans()
+
+    @unittest.skipUnless(os.path.exists(SOURCE_DATABASE), 'food_supplier.db ausente')
+    def test_existing_database(self):
+        # The bundled data gives the planner real statistics to choose from.
+        path = os.path.join(self.scratch_dir, 'food_supplier.db')
+        shutil.copyfile(SOURCE_DATABASE, path)
+        self.migrate(path)
+        self.assert_query_plans()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,64 +4,24 @@ import tkinter as tk
 from tkinter import ttk
 from tkinter import messagebox
 from ui_config import apply_styles
-import sqlite3
 from datetime import datetime
 
-DATABASE_PATH = 'food_supplier.db'
-
-
-def connect_to_db():
-    try:
-        conn = sqlite3.connect(DATABASE_PATH)
-        return conn
-    except sqlite3.Error as e:
-        print(f"Erro ao conectar-se ao banco de dados: {e}")
-        return None
+import data_access
+import db_worker
 
 
 def get_top_customers(n):
-    conn = connect_to_db()
-    if conn is None:
-        return []
-
-    cursor = conn.cursor()
-    query = '''
-    SELECT Clientes.client_name, SUM(Compras.total_amount) as total_spent
-    FROM Compras
-    JOIN Clientes ON Compras.client_id = Clientes.client_id
-    GROUP BY Clientes.client_name
-    ORDER BY total_spent DESC
-    LIMIT ?
-    '''
-    print(f"Executing query: \n{query}\nWith parameter: {n}")
-    cursor.execute(query, (n,))
-    top_customers = cursor.fetchall()
+    print(f"Executing query: \n{data_access.SQL_TOP_CUSTOMERS}\nWith parameter: {n}")
+    top_customers = data_access.fetch_top_customers(n)
     print(f"Top customers fetched: {top_customers}")
-    conn.close()
     return top_customers
 
 
 def get_top_customers_current_month(n):
-    conn = connect_to_db()
-    if conn is None:
-        return []
-
-    cursor = conn.cursor()
     current_month = datetime.now().strftime('%Y-%m')
-    query = '''
-    SELECT Clientes.client_name, SUM(Compras.total_amount) as total_spent
-    FROM Compras
-    JOIN Clientes ON Compras.client_id = Clientes.client_id
-    WHERE strftime('%Y-%m', Compras.purchase_date) = ?
-    GROUP BY Clientes.client_name
-    ORDER BY total_spent DESC
-    LIMIT ?
-    '''
-    print(f"Executing query: \n{query}\nWith parameters: {current_month}, {n}")
-    cursor.execute(query, (current_month, n))
-    top_customers = cursor.fetchall()
+    print(f"Executing query: \n{data_access.SQL_TOP_CUSTOMERS_FOR_MONTH}\nWith parameters: {current_month}, {n}")
+    top_customers = data_access.fetch_top_customers_for_month(current_month, n)
     print(f"Top customers fetched for current month: {top_customers}")
-    conn.close()
     return top_customers
 
 
@@ -74,18 +34,21 @@ def show_top_customers_interface():
             messagebox.showerror("Erro", "Por favor, insira um número válido.")
             return
 
+        def show(top_customers):
+            results_text.delete('1.0', tk.END)  # Clear previous results
+            for i, (name, total_spent) in enumerate(top_customers, start=1):
+                results_text.insert(tk.END, f"{i}. {name}: R${total_spent:.2f}\n")
+
         if selected_option.get() == "overall":
-            top_customers = get_top_customers(n)
+            db_worker.submit(top_customers_window, get_top_customers, n, on_done=show, profile='reporting')
         else:
-            top_customers = get_top_customers_current_month(n)
-
-        results_text.delete('1.0', tk.END)  # Clear previous results
-        for i, (name, total_spent) in enumerate(top_customers, start=1):
-            results_text.insert(tk.END, f"{i}. {name}: R${total_spent:.2f}\n")
+            db_worker.submit(top_customers_window, get_top_customers_current_month, n, on_done=show,
+                             profile='reporting')
 
     top_customers_window = tk.Toplevel()
     top_customers_window.title("Top Clientes")
     top_customers_window.geometry("400x400")
+    db_worker.watch_busy(top_customers_window)
 
     apply_styles(top_customers_window)  # Apply styles
 
@@ -0,0 +1,33 @@
+def reconcile(tree, rows):
+    """Make a flat Treeview show `rows`, a list of (iid, values) in display order.
+
+    Only rows that were added, removed, changed or moved are touched, so the
+    selection, focus and scroll position survive a refresh. The values last
+    shown are kept on the tree itself, which spares a Tk round trip per row
+    to compare them.
+    """
+    shown = getattr(tree, 'shown_rows', {})
+    wanted = {str(iid): tuple(values) for iid, values in rows}
+
+    removed = [iid for iid in shown if iid not in wanted]
+    if removed:
+        tree.delete(*removed)
+
+    kept = [iid for iid in shown if iid in wanted]
+    position = 0
+    moved = set()
+    for index, (iid, values) in enumerate(wanted.items()):
+        while position < len(kept) and kept[position] in moved:
+            position += 1
+        if iid not in shown:
+            tree.insert('', index, iid=iid, values=values)
+            continue
+        if position < len(kept) and kept[position] == iid:
+            position += 1
+        else:
+            tree.move(iid, '', index)
+            moved.add(iid)
+        if shown[iid] != values:
+            tree.item(iid, values=values)
+
+    tree.shown_rows = wanted
@@ -1,9 +1,11 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-import sqlite3
 from datetime import datetime
 from ui_config import apply_styles
 
+import data_access
+import db_worker
+
 
 def convert_date_format(date_str):
     try:
@@ -15,33 +17,11 @@ def convert_date_format(date_str):
     return converted_date
 
 
-def get_next_birthday(birthday):
-    current_year = datetime.now().year
-    birthday_this_year = datetime.strptime(birthday, "%Y-%m-%d").replace(year=current_year)
-    if birthday_this_year < datetime.now():
-        birthday_next_year = birthday_this_year.replace(year=current_year + 1)
-        return birthday_next_year
-    return birthday_this_year
-
-
 def show_upcoming_birthdays(num_items):
-    conn = sqlite3.connect('food_supplier.db')
-    cursor = conn.cursor()
-
-    cursor.execute('''
-    SELECT client_name, birthday 
-    FROM Clientes
-    ''')
-    birthdays = cursor.fetchall()
-    conn.close()
-
-    # Convert all birthdays to YYYY-MM-DD format for sorting
-    converted_birthdays = [(name, convert_date_format(bday)) for name, bday in birthdays]
-
-    today = datetime.now()
-    sorted_birthdays = sorted(converted_birthdays, key=lambda x: (get_next_birthday(x[1]) - today).days)
-
-    return sorted_birthdays[:num_items]  # Return the number of birthdays specified by user
+    # Birthdays from today onwards, wrapping to January, in order of the
+    # indexed month-day key; only the rows shown are converted.
+    birthdays = data_access.fetch_upcoming_birthdays(datetime.now().strftime('%m-%d'), num_items)
+    return [(name, convert_date_format(bday)) for name, bday in birthdays]
 
 
 def open_upcoming_birthdays_window():
@@ -49,6 +29,7 @@ def open_upcoming_birthdays_window():
     upcoming_birthdays_window.title("Próximos Aniversários")
     upcoming_birthdays_window.geometry("600x400")
     upcoming_birthdays_window.minsize(600, 400)
+    db_worker.watch_busy(upcoming_birthdays_window)
 
     apply_styles(upcoming_birthdays_window)  # Apply styles
 
@@ -79,13 +60,17 @@ def open_upcoming_birthdays_window():
             num_items = int(num_items_var.get())
             if num_items <= 0:
                 raise ValueError
-            birthdays = show_upcoming_birthdays(num_items)
+        except ValueError:
+            messagebox.showerror("Erro", "Por favor, insira um número válido.")
+            return
+
+        def show(birthdays):
             tree.delete(*tree.get_children())
             for birthday in birthdays:
                 tree.insert('', tk.END,
                             values=(birthday[0], datetime.strptime(birthday[1], "%Y-%m-%d").strftime('%d/%m/%Y')))
-        except ValueError:
-            messagebox.showerror("Erro", "Por favor, insira um número válido.")
+
+        db_worker.submit(tree, show_upcoming_birthdays, num_items, on_done=show)
 
     update_button = ttk.Button(control_frame, text="Atualizar", command=update_tree, style="TButton")
     update_button.pack(side=tk.LEFT)
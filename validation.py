@@ -0,0 +1,25 @@
+import re
+from datetime import datetime
+
+
+def validate_inputs(client_name, birthday, address):
+    errors = []
+    if not client_name:
+        errors.append("Nome do Cliente é obrigatório")
+    if not birthday:
+        errors.append("Data de Aniversário é obrigatória")
+    elif not re.match(r'\d{2}/\d{2}/\d{4}', birthday):
+        errors.append("Data de Aniversário deve estar no formato DD/MM/YYYY")
+    if not address:
+        errors.append("Endereço é obrigatório")
+    return errors
+
+
+def validate_date(date_text):
+    try:
+        if re.match(r'^\d{2}/\d{2}/\d{4}$', date_text):
+            datetime.strptime(date_text, '%d/%m/%Y')
+            return True
+        return False
+    except ValueError:
+        return False
@@ -0,0 +1,145 @@
+import tkinter as tk
+
+import data_access
+import db_worker
+
+# How many pages stay loaded; pages further away than this are dropped and
+# fetched again (by key) if the user scrolls back to them.
+MAX_PAGES = 5
+
+
+class VirtualListbox(tk.Listbox):
+    """Listbox over a large ordered table that only holds a window of rows.
+
+    fetch_page(key, direction, limit) returns the rows after/before the row
+    with `key` (see data_access.fetch_page), row_key(row) gives that key and
+    format_row(row) the line shown. Pages are read on the database thread
+    (see db_worker). The next page is fetched when the view gets within half
+    a page of either end of the loaded window, and pages beyond MAX_PAGES are
+    dropped from the far end.
+    """
+
+    def __init__(self, master, fetch_page, row_key, format_row, page_size=data_access.PAGE_SIZE, **kwargs):
+        super().__init__(master, **kwargs)
+        self.fetch_page = fetch_page
+        self.row_key = row_key
+        self.format_row = format_row
+        self.page_size = page_size
+        self.rows = []
+        self.more_before = False
+        self.more_after = False
+        self.paged = False
+        self.scrollbar = None
+        self._prefetch = None
+        self._loading = None
+        self.config(yscrollcommand=self._on_view_change)
+
+    def attach_scrollbar(self, scrollbar):
+        self.scrollbar = scrollbar
+
+    def reload(self):
+        """Show the table from its first row."""
+        self._fetch(None, 'after', self.page_size, lambda rows: self._replace(rows, self.page_size))
+
+    def refresh(self):
+        """Re-read the loaded window after a change, keeping the scroll position."""
+        if not self.paged or not self.rows:
+            self.reload()
+            return
+        top = self.nearest(0)
+        limit = max(len(self.rows), self.page_size)
+        more_before = self.more_before
+        # From the top of the table the window restarts at the first row, so
+        # rows added before the old first one show up too.
+        key = self.row_key(self.rows[0]) if more_before else None
+
+        def apply(rows):
+            self._replace(rows, limit, more_before)
+            self.yview(top)
+
+        self._fetch(key, 'from', limit, apply)
+
+    def show_rows(self, rows):
+        """Show a fixed set of rows (e.g. search results); None goes back to paging the table."""
+        if rows is None:
+            self.reload()
+        else:
+            self._cancel_load()
+            self._replace(rows)
+
+    def selected_row(self):
+        selection = self.curselection()
+        return self.rows[selection[0]] if selection else None
+
+    def _fetch(self, key, direction, limit, apply):
+        # Pages are read on the database thread; only one load is in flight and
+        # a new reload/refresh supersedes it.
+        self._cancel_load()
+
+        def done(rows):
+            self._loading = None
+            apply(rows)
+
+        def failed(error):
+            self._loading = None
+            db_worker.report_error(error)
+
+        self._loading = db_worker.submit(self, self.fetch_page, key, direction, limit, on_done=done, on_error=failed)
+
+    def _cancel_load(self):
+        if self._loading is not None:
+            self._loading.cancel()
+            self._loading = None
+
+    def _replace(self, rows, limit=None, more_before=False):
+        # limit is the page query's LIMIT; without one the rows are a fixed set.
+        self.paged = limit is not None
+        self.rows = list(rows)
+        self.more_before = more_before
+        self.more_after = self.paged and len(self.rows) >= limit
+        self.delete(0, tk.END)
+        self.insert(tk.END, *[self.format_row(row) for row in self.rows])
+
+    def _on_view_change(self, first, last):
+        if self.scrollbar is not None:
+            self.scrollbar.set(first, last)
+        if self._prefetch is None and (self.more_after or self.more_before):
+            self._prefetch = self.after_idle(self._load_around_view)
+
+    def _load_around_view(self):
+        self._prefetch = None
+        if not self.rows or self._loading is not None:
+            return
+        top = self.nearest(0)
+        bottom = self.nearest(self.winfo_height())
+        threshold = self.page_size // 2
+        if self.more_after and len(self.rows) - bottom <= threshold:
+            self._fetch(self.row_key(self.rows[-1]), 'after', self.page_size, self._append_page)
+        elif self.more_before and top <= threshold:
+            self._fetch(self.row_key(self.rows[0]), 'before', self.page_size, self._prepend_page)
+
+    def _append_page(self, rows):
+        top = self.nearest(0)
+        self.more_after = len(rows) >= self.page_size
+        self.rows.extend(rows)
+        self.insert(tk.END, *[self.format_row(row) for row in rows])
+        excess = len(self.rows) - MAX_PAGES * self.page_size
+        if excess > 0:
+            del self.rows[:excess]
+            self.delete(0, excess - 1)
+            self.more_before = True
+            self.yview(max(top - excess, 0))
+
+    def _prepend_page(self, rows):
+        top = self.nearest(0)
+        self.more_before = len(rows) >= self.page_size
+        if not rows:
+            return
+        self.rows[:0] = rows
+        self.insert(0, *[self.format_row(row) for row in rows])
+        excess = len(self.rows) - MAX_PAGES * self.page_size
+        if excess > 0:
+            del self.rows[-excess:]
+            self.delete(len(self.rows), tk.END)
+            self.more_after = True
+        self.yview(top + len(rows))